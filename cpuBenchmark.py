@@ -1,3 +1,4 @@
+import os
 import time
 import multiprocessing
 
@@ -45,6 +46,7 @@ def perform_single_core_test(progress_callback):
         fibonacci_result = fibonacci(35)
         elapsed_time = time.time() - start_time
         calculation_results.append(elapsed_time)
+        progress_callback.emit_sample("Single-Core fibonacci(35) (s)", elapsed_time)
 
         progress = int(((i + 1) / num_calculations) * 100)
         progress_callback.update_progress(progress)
@@ -74,12 +76,17 @@ Returns:
 def perform_multi_core_test(progress_callback):
     progress_callback.emit_current_test_info("Running Multi-Core Test")
 
-    num_processes = multiprocessing.cpu_count()
+    # Only use the cores we are allowed to run on, the benchmark may have been pinned to a subset of them
+    if hasattr(os, "sched_getaffinity"):
+        num_processes = len(os.sched_getaffinity(0))
+    else:
+        num_processes = multiprocessing.cpu_count()
     num_calculations = 10
     chunk_size = num_calculations // num_processes
 
     pool = multiprocessing.Pool(processes=num_processes)
     results = []
+    start_time = time.time()
 
     for i in range(num_processes):
         start = i * chunk_size
@@ -89,12 +96,29 @@ def perform_multi_core_test(progress_callback):
 
     pool.close()
 
+    # Only report progress when another worker has finished, there is nothing new to show in between
     completed_results = 0
-    while completed_results < num_calculations:
-        completed_results = sum(result.ready() for result in results)
-        progress = int((completed_results / num_calculations) * 100)
-        progress_callback.update_progress(progress)
-        time.sleep(0.01)
+    finished = set()
+    try:
+        while completed_results < len(results):
+            # Wait on a worker that hasn't finished yet, waiting on a finished one would return at once and spin
+            pending = [result for result in results if not result.ready()]
+            if pending:
+                pending[0].wait(0.1)
+            ready = sum(result.ready() for result in results)
+            if ready != completed_results:
+                completed_results = ready
+                # The time until each worker finished, the spread shows how evenly the cores kept up
+                for index, result in enumerate(results):
+                    if result.ready() and index not in finished:
+                        finished.add(index)
+                        progress_callback.emit_sample("Multi-Core worker finished after (s)", time.time() - start_time)
+                progress = int((completed_results / len(results)) * 100)
+                progress_callback.update_progress(progress)
+    except BaseException:
+        # e.g. the memory ceiling was hit, don't leave the workers running
+        pool.terminate()
+        raise
 
     pool.join()
 
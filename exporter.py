@@ -0,0 +1,277 @@
+import csv
+import hashlib
+import json
+import math
+import os
+import platform
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+RECORD_FIELDS = ["timestamp", "host", "fingerprint", "suite", "profiled", "kind", "test", "metric", "percentile", "value"]
+LABEL_FIELDS = ["host", "fingerprint", "suite", "profiled", "test", "metric", "percentile"]
+
+# Keys of the results that hold raw time series rather than results, e.g. the telemetry samples
+SKIPPED_KEYS = {"samples"}
+# Sections the run wrappers add to the results, which describe the run rather than a test. Each is exported as its own
+# metric family, with the section's keys as the metric.
+RUN_SECTIONS = {
+    "telemetry": ("benchmark_telemetry", "Telemetry summary of a benchmark run"),
+    "memory": ("benchmark_memory", "Memory footprint of a benchmark run"),
+    "profile": ("benchmark_profile", "Profiler details of a profiled benchmark run"),
+}
+
+_machine = None
+
+
+"""
+Describes the machine the benchmarks ran on. The fingerprint is a short hash of the hardware and software details, so
+results from identical machines can be grouped even if their host names differ.
+
+Returns:
+    dict: The machine details, including "host" and "fingerprint".
+"""
+def machine_fingerprint():
+    global _machine
+    if _machine is None:
+        details = {
+            "system": platform.system(),
+            "release": platform.release(),
+            "machine": platform.machine(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": str(os.cpu_count()),
+            "python": platform.python_version(),
+        }
+        digest = hashlib.sha256(json.dumps(details, sort_keys=True).encode()).hexdigest()[:12]
+        _machine = dict(details, host=platform.node(), fingerprint=digest)
+    return _machine
+
+
+"""
+Converts numpy/TensorFlow scalars and other number-like values into plain Python values so they can be written out.
+
+Args:
+    value: The value to convert.
+
+Returns:
+    The value as a bool, int, float, str, list or dict.
+"""
+def to_builtin(value):
+    if isinstance(value, (bool, int, float, str)) or value is None:
+        return value
+    if isinstance(value, dict):
+        return {str(key): to_builtin(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_builtin(item) for item in value]
+    if hasattr(value, "numpy"):
+        value = value.numpy()
+    if hasattr(value, "item"):
+        return value.item()
+    return float(value)
+
+
+def _is_number(value):
+    return isinstance(value, (bool, int, float)) or hasattr(value, "__float__")
+
+
+"""
+Walks a (possibly nested) results dict and yields every numeric value with the path of keys leading to it. Lists are
+skipped, they are raw time series.
+"""
+def _flatten(results, path=()):
+    for key, value in results.items():
+        if key in SKIPPED_KEYS:
+            continue
+        if isinstance(value, dict):
+            yield from _flatten(value, path + (str(key),))
+        elif isinstance(value, (list, tuple, str)) or value is None:
+            continue
+        elif _is_number(value):
+            yield path + (str(key),), float(to_builtin(value))
+
+
+"""
+Converts the results of one benchmark run into flat records, the model every export format is written from.
+
+Every numeric value in the results becomes a "result" record. The first key is the test and the remaining keys form
+the metric name; a final key such as "p99" marks a latency percentile and is stored as the percentile. The values of
+the RUN_SECTIONS (telemetry, memory, profile) are not test results, they become records of the section's kind with
+the keys as the metric. The total score and total wattage become "total_score" and "energy" records. Every record of
+a profiled run has "profiled" set to "true".
+
+Args:
+    suite (str): The name of the suite, e.g. "CPU Benchmark".
+    benchmark_results (dict): The results returned by the suite.
+    total_score (float): The total score of the run.
+    total_wattage (float): The total wattage of the run.
+    timestamp (float): When the run finished, defaults to now.
+
+Returns:
+    list: The records, as dicts with the RECORD_FIELDS keys.
+"""
+def to_records(suite, benchmark_results, total_score, total_wattage, timestamp=None):
+    machine = machine_fingerprint()
+    base = {
+        "timestamp": round(timestamp or time.time(), 3),
+        "host": machine["host"],
+        "fingerprint": machine["fingerprint"],
+        "suite": suite,
+        # Profiled runs are slower, labelled so they never replace or get averaged with the series of normal runs
+        "profiled": "true" if "profile" in benchmark_results else "",
+    }
+
+    records = []
+    tests = {key: value for key, value in benchmark_results.items() if key not in RUN_SECTIONS}
+    for path, value in _flatten(tests):
+        percentile = ""
+        match = re.fullmatch(r"p(\d+(?:\.\d+)?)", path[-1])
+        if match and len(path) > 1:
+            percentile = match.group(1)
+            path = path[:-1]
+        metric = "_".join(path[1:]) or "score"
+        records.append(dict(base, kind="result", test=path[0], metric=metric, percentile=percentile, value=value))
+
+    for section in RUN_SECTIONS:
+        if isinstance(benchmark_results.get(section), dict):
+            for path, value in _flatten(benchmark_results[section]):
+                records.append(dict(base, kind=section, test="", metric="_".join(path), percentile="", value=value))
+
+    records.append(dict(base, kind="total_score", test="", metric="", percentile="", value=float(to_builtin(total_score))))
+    records.append(dict(base, kind="energy", test="", metric="", percentile="", value=float(to_builtin(total_wattage))))
+    return records
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    return "{" + ",".join('{}="{}"'.format(key, _escape_label(value)) for key, value in labels.items() if value != "") + "}"
+
+
+def _format_value(value):
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+"""
+Formats records in the OpenMetrics text format. Repeated runs of a suite would produce the same series twice, so only
+the latest value of each series is written.
+
+node_exporter's textfile collector parses the older Prometheus text format (0.0.4), which has no info type and no
+"# EOF" line, and drops the whole file if it finds either. With prometheus=True the machine details are written as a
+gauge and the "# EOF" is left out, which is otherwise the same exposition.
+
+Args:
+    records (list): The records from to_records.
+    prometheus (bool): Whether to write the Prometheus text format instead.
+
+Returns:
+    str: The exposition, ending with "# EOF" in the OpenMetrics format.
+"""
+def format_openmetrics(records, prometheus=False):
+    families = {
+        "result": ("benchmark_result", "Result of a single benchmark test"),
+        "total_score": ("benchmark_total_score", "Total score of a benchmark suite"),
+        "energy": ("benchmark_energy_watts", "Wattage measured during a benchmark suite"),
+    }
+    families.update(RUN_SECTIONS)
+
+    series = {}
+    for record in records:
+        labels = {key: record[key] for key in LABEL_FIELDS}
+        series[(record["kind"], tuple(labels.items()))] = (labels, record["value"])
+
+    lines = []
+    machine = machine_fingerprint()
+    if prometheus:
+        lines.append("# HELP benchmark_machine_info Details of the machine the benchmarks ran on")
+        lines.append("# TYPE benchmark_machine_info gauge")
+    else:
+        lines.append("# TYPE benchmark_machine info")
+        lines.append("# HELP benchmark_machine Details of the machine the benchmarks ran on")
+    lines.append("benchmark_machine_info{} 1".format(_format_labels(machine)))
+
+    for kind, (name, help_text) in families.items():
+        samples = [(labels, value) for (series_kind, _), (labels, value) in series.items() if series_kind == kind]
+        if not samples:
+            continue
+        lines.append("# TYPE {} gauge".format(name))
+        lines.append("# HELP {} {}".format(name, help_text))
+        for labels, value in samples:
+            lines.append("{}{} {}".format(name, _format_labels(labels), _format_value(value)))
+
+    if not prometheus:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+"""
+Writes the records in the Prometheus text format for the node_exporter textfile collector. The file is written to a temp
+file and renamed into place, so the collector never reads a half written file.
+
+Args:
+    records (list): The records from to_records.
+    path (str): The path of the .prom file.
+"""
+def write_textfile(records, path):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(handle, "w") as f:
+        f.write(format_openmetrics(records, prometheus=True))
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, path)
+
+
+def write_csv(records, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RECORD_FIELDS)
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def write_jsonl(records, path):
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+"""
+Serves the records on a local HTTP /metrics endpoint in the OpenMetrics format, from a background thread.
+
+Args:
+    get_records (function): Returns the current records, called on every scrape.
+    host (str): The address to listen on.
+    port (int): The port to listen on.
+
+Returns:
+    ThreadingHTTPServer: The running server, call shutdown() on it to stop it.
+"""
+def serve_metrics(get_records, host="127.0.0.1", port=9101):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+
+            body = format_openmetrics(get_records()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,396 @@
+import argparse
+import hmac
+import json
+import os
+import socket
+import socketserver
+import statistics
+import threading
+
+from exporter import machine_fingerprint, to_builtin, to_records
+from isolation import BenchmarkCancelled, error_summary
+from netBenchmark import percentile
+from scheduler import SUITES, run_schedule, run_suite
+
+
+AGENT_PORT = 9200
+# A shared secret the coordinator has to send with every request, agents listening beyond loopback must have one
+AGENT_TOKEN = os.environ.get("BENCHMARK_AGENT_TOKEN")
+# The schedule and run options a coordinator may set. Anything that names a path on the agent (e.g. profile_dir) is
+# left out, the agent uses its own defaults for those.
+SCHEDULE_KEYS = {"passes", "shuffle", "cooldown", "wait_idle", "seed"}
+OPTION_KEYS = {
+    "telemetry", "telemetry_interval", "isolate", "cores", "niceness", "profile", "profile_allocations",
+    "memory_ceiling_mb",
+}
+# An agent is an outlier for a metric when its modified z-score (based on the median absolute deviation) is above this
+OUTLIER_THRESHOLD = 3.5
+# Below this many agents the median absolute deviation is too noisy to call anything an outlier
+MIN_OUTLIER_AGENTS = 5
+
+
+def _send(connection, message):
+    connection.sendall((json.dumps(to_builtin(message)) + "\n").encode())
+
+
+class AgentProgress:
+    """
+    Stands in for the BenchmarkWorker on an agent and streams progress back to the coordinator as JSON lines.
+    Progress and test info are only sent when they change. If the coordinator goes away the run is cancelled.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.lock = threading.Lock()
+        self.progress = None
+        self.test_info = None
+        self.cancelled = False
+        self.isolated_run = None
+
+    def send(self, message):
+        if self.cancelled:
+            return
+        try:
+            with self.lock:
+                _send(self.connection, message)
+        except OSError:
+            self.cancel()
+
+    def cancel(self):
+        self.cancelled = True
+        if self.isolated_run is not None:
+            self.isolated_run.cancel()
+
+    def set_isolated_run(self, isolated_run):
+        self.isolated_run = isolated_run
+        if self.cancelled:
+            isolated_run.cancel()
+
+    def update_progress(self, progress):
+        if progress != self.progress:
+            self.progress = progress
+            self.send({"type": "progress", "progress": progress})
+
+    def emit_current_test_info(self, test_info):
+        if test_info != self.test_info:
+            self.test_info = test_info
+            self.send({"type": "info", "info": test_info})
+
+    def emit_sample(self, label, value):
+        self.send({"type": "sample", "label": label, "value": value})
+
+
+class AgentHandler(socketserver.StreamRequestHandler):
+    """
+    Handles a single request from the coordinator: one JSON line with the suites to run and the run options, answered
+    with progress messages and finally the result or an error. Only one run can be in progress on an agent at a time.
+    Any failure is sent back to the coordinator as an error rather than dropping the connection.
+    """
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+
+        try:
+            request, error = parse_request(line, self.server.token)
+        except ValueError as parse_error:
+            request, error = None, "Invalid request: {}".format(parse_error)
+        if error:
+            _send(self.connection, {"type": "error", "error": error})
+            return
+
+        if not self.server.run_lock.acquire(blocking=False):
+            _send(self.connection, {"type": "error", "error": "Agent is busy"})
+            return
+
+        progress = AgentProgress(self.connection)
+        options = request["options"]
+        try:
+            report, total_score, total_wattage = run_schedule(
+                request["suites"],
+                progress,
+                run_fn=lambda benchmark_fn: run_suite(benchmark_fn, progress, options, progress.set_isolated_run),
+                is_cancelled=lambda: progress.cancelled,
+                **request["schedule"]
+            )
+        except BenchmarkCancelled:
+            progress.send({"type": "error", "error": "Cancelled"})
+            return
+        except Exception as error:
+            progress.send({"type": "error", "error": error_summary(error)})
+            return
+        finally:
+            self.server.run_lock.release()
+
+        # The telemetry time series can be large and is not needed for the fleet statistics
+        for run in report["runs"]:
+            if "telemetry" in run.get("results", {}):
+                run["results"]["telemetry"].pop("samples", None)
+
+        progress.send({
+            "type": "result",
+            "machine": machine_fingerprint(),
+            "report": report,
+            "total_score": total_score,
+            "total_wattage": total_wattage,
+        })
+
+
+"""
+Parses and validates a request line from the coordinator.
+
+Args:
+    line (bytes): The JSON request.
+    token (str): The token the request must carry, or None if the agent has none.
+
+Returns:
+    tuple: The request (with "suites", "options" and "schedule") and None, or None and the reason it was refused.
+"""
+def parse_request(line, token=None):
+    request = json.loads(line)
+    if not isinstance(request, dict) or request.get("type") != "run":
+        return None, "Invalid request"
+
+    if token is not None and not hmac.compare_digest(str(request.get("token", "")), token):
+        return None, "Invalid token"
+
+    suite_names = request.get("suites")
+    if not isinstance(suite_names, list) or not suite_names:
+        return None, "Invalid request, no suites"
+    unknown = [name for name in suite_names if name not in SUITES]
+    if unknown:
+        return None, "Invalid request, unknown suites: {}".format(unknown)
+
+    parsed = {"suites": suite_names}
+    for field, allowed in (("options", OPTION_KEYS), ("schedule", SCHEDULE_KEYS)):
+        values = request.get(field) or {}
+        if not isinstance(values, dict):
+            return None, "Invalid request, {} must be an object".format(field)
+        unsupported = sorted(set(values) - allowed)
+        if unsupported:
+            return None, "Invalid request, unsupported {}: {}".format(field, unsupported)
+        parsed[field] = values
+    return parsed, None
+
+
+class AgentServer(socketserver.ThreadingTCPServer):
+    """
+    Every agent has its own run lock rather than the GUI's RUN_LOCK, so several agents can run in one process (e.g.
+    on different ports of one host while testing) without refusing each other's runs.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, server_address, handler_class, token=None):
+        super().__init__(server_address, handler_class)
+        self.token = token
+        self.run_lock = threading.Lock()
+
+
+"""
+Starts an agent that runs benchmark suites when a coordinator asks it to.
+
+Args:
+    host (str): The address to listen on.
+    port (int): The port to listen on.
+    token (str): A shared secret every request has to carry.
+
+Returns:
+    AgentServer: The server. Call serve_forever() on it, or shutdown() to stop it when it runs on another thread.
+"""
+def start_agent(host="127.0.0.1", port=AGENT_PORT, token=AGENT_TOKEN):
+    return AgentServer((host, port), AgentHandler, token)
+
+
+class Coordinator:
+    """
+    Sends a suite configuration to every registered agent at the same time, relays their progress and gathers their
+    results into fleet wide statistics.
+    """
+
+    def __init__(self, token=AGENT_TOKEN):
+        self.agents = []
+        self.token = token
+
+    def register(self, host, port=AGENT_PORT):
+        self.agents.append((host, port))
+
+    """
+    Runs the suites on every registered agent and waits for all of them to finish.
+
+    Args:
+        suite_names (list): The suites to run, keys of SUITES.
+        options (dict): The run options applied on the agents (see scheduler.run_suite).
+        schedule (dict): Keyword arguments for scheduler.run_schedule, e.g. passes and cooldown.
+        on_message (function): Called as on_message(agent, message) for every progress message, where agent is
+            "host:port". Called from the agent's thread.
+        timeout (float): Seconds to wait for an agent to send anything before giving up on it.
+
+    Returns:
+        dict: The result (or error) of every agent and the fleet statistics.
+    """
+    def run(self, suite_names, options=None, schedule=None, on_message=None, timeout=3600):
+        request = {"type": "run", "suites": suite_names, "options": options or {}, "schedule": schedule or {}}
+        if self.token is not None:
+            request["token"] = self.token
+        results = {}
+        threads = []
+
+        for host, port in self.agents:
+            agent = "{}:{}".format(host, port)
+            thread = threading.Thread(
+                target=self._run_agent, args=(agent, host, port, request, on_message, timeout, results)
+            )
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+
+        return {
+            "agents": results,
+            "fleet": fleet_statistics({agent: result for agent, result in results.items() if "report" in result}),
+        }
+
+    def _run_agent(self, agent, host, port, request, on_message, timeout, results):
+        try:
+            with socket.create_connection((host, port), timeout=timeout) as connection:
+                _send(connection, request)
+                for line in connection.makefile("r"):
+                    message = json.loads(line)
+                    if message["type"] in ("result", "error"):
+                        results[agent] = message
+                        return
+                    if on_message is not None:
+                        on_message(agent, message)
+            results[agent] = {"type": "error", "error": "Agent closed the connection"}
+        except (OSError, ValueError) as error:
+            results[agent] = {"type": "error", "error": str(error)}
+
+
+"""
+Computes fleet wide statistics from the agents' results. Each agent contributes one value per metric (the mean over
+its passes); for every metric this returns the p50/p90/p99, mean, min and max across agents and the agents whose value
+is an outlier by the modified z-score.
+
+Args:
+    results (dict): The "result" message of each agent, keyed by agent.
+
+Returns:
+    dict: The statistics, keyed by "suite/test/metric" (with the percentile or kind appended where there is one, and
+    "profiled" for profiled runs).
+"""
+def fleet_statistics(results):
+    values = {}
+    for agent, result in results.items():
+        per_agent = {}
+        for run in result["report"]["runs"]:
+            if "error" in run:
+                continue
+            records = to_records(SUITES[run["suite"]][0], run["results"], run["total_score"], run["total_wattage"])
+            for record in records:
+                parts = [record["suite"], record["test"] or record["kind"], record["metric"], record["percentile"]]
+                if record["profiled"]:
+                    parts.append("profiled")
+                key = "/".join(part for part in parts if part)
+                per_agent.setdefault(key, []).append(record["value"])
+        for key, agent_values in per_agent.items():
+            values.setdefault(key, {})[agent] = statistics.mean(agent_values)
+
+    fleet = {}
+    for key, agent_values in values.items():
+        ordered = sorted(agent_values.values())
+        median = statistics.median(ordered)
+        deviation = statistics.median(abs(value - median) for value in ordered)
+
+        outliers = []
+        if deviation and len(ordered) >= MIN_OUTLIER_AGENTS:
+            for agent, value in agent_values.items():
+                if abs(0.6745 * (value - median) / deviation) > OUTLIER_THRESHOLD:
+                    outliers.append(agent)
+
+        fleet[key] = {
+            "agents": len(ordered),
+            "p50": percentile(ordered, 50),
+            "p90": percentile(ordered, 90),
+            "p99": percentile(ordered, 99),
+            "mean": statistics.mean(ordered),
+            "min": ordered[0],
+            "max": ordered[-1],
+            "outliers": outliers,
+        }
+    return fleet
+
+
+def _parse_agent(text):
+    host, _, port = text.rpartition(":")
+    return (host, int(port)) if host else (text, AGENT_PORT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suites on many machines at once.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    agent_parser = subparsers.add_parser("agent", help="Run suites on this machine when the coordinator asks")
+    agent_parser.add_argument("--host", default="127.0.0.1", help="Use 0.0.0.0 to accept coordinators on the network")
+    agent_parser.add_argument("--port", type=int, default=AGENT_PORT)
+    agent_parser.add_argument("--token", default=AGENT_TOKEN, help="Shared secret, defaults to $BENCHMARK_AGENT_TOKEN")
+
+    coordinator_parser = subparsers.add_parser("coordinator", help="Run suites on a set of agents")
+    coordinator_parser.add_argument("--agent", action="append", required=True, help="host:port of an agent")
+    coordinator_parser.add_argument("--token", default=AGENT_TOKEN, help="Shared secret, defaults to $BENCHMARK_AGENT_TOKEN")
+    coordinator_parser.add_argument("--suite", action="append", required=True, choices=sorted(SUITES))
+    coordinator_parser.add_argument("--passes", type=int, default=1)
+    coordinator_parser.add_argument("--cooldown", type=float, default=10)
+    coordinator_parser.add_argument("--no-wait-idle", action="store_true", help="Don't wait for idle between suites")
+    coordinator_parser.add_argument("--isolate", action="store_true", help="Run each suite in its own process")
+    coordinator_parser.add_argument("--telemetry", action="store_true", help="Sample telemetry during runs")
+    coordinator_parser.add_argument("--memory-ceiling", type=float, help="Abort a suite above this RSS, in MB")
+    coordinator_parser.add_argument("--output", help="Write the fleet report to this JSON file")
+
+    args = parser.parse_args()
+
+    if args.command == "agent":
+        if not args.token and args.host not in ("127.0.0.1", "localhost", "::1"):
+            parser.error("an agent listening on {} needs a --token".format(args.host))
+        server = start_agent(args.host, args.port, args.token)
+        print("Agent listening on {}:{}".format(args.host, args.port))
+        server.serve_forever()
+        return
+
+    coordinator = Coordinator(args.token)
+    for agent in args.agent:
+        coordinator.register(*_parse_agent(agent))
+
+    def print_progress(agent, message):
+        if message["type"] == "progress":
+            print("[{}] {}%".format(agent, message["progress"]))
+        elif message["type"] == "info":
+            print("[{}] {}".format(agent, message["info"]))
+
+    fleet_report = coordinator.run(
+        args.suite,
+        options={"isolate": args.isolate, "telemetry": args.telemetry, "memory_ceiling_mb": args.memory_ceiling},
+        schedule={"passes": args.passes, "cooldown": args.cooldown, "wait_idle": not args.no_wait_idle},
+        on_message=print_progress,
+    )
+
+    for agent, result in fleet_report["agents"].items():
+        if result["type"] == "error":
+            print("[{}] failed: {}".format(agent, result["error"]))
+
+    for key, stats in fleet_report["fleet"].items():
+        print("{}: p50 {:.3f}, p90 {:.3f}, p99 {:.3f}{}".format(
+            key, stats["p50"], stats["p90"], stats["p99"],
+            ", outliers: " + ", ".join(stats["outliers"]) if stats["outliers"] else ""
+        ))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(fleet_report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
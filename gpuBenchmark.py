@@ -2,6 +2,7 @@ import numpy as np
 import tensorflow as tf
 from PyQt6.QtCore import QThread, pyqtSignal
 import concurrent.futures
+import time
 from wattage import measure_wattage
 
 
@@ -19,6 +20,9 @@ class BenchmarkWorker(QThread):
     def emit_current_test_info(self, text):
         self.current_test_info.emit(text)
 
+    def emit_sample(self, label, value):
+        pass
+
 
 """
 Performs a GPU benchmark by running matrix multiplication, elementwise multiplication, convolution, and custom operation
@@ -96,11 +100,14 @@ def run_matrix_multiply_benchmark(benchmark_worker):
 
     scores = []
     for _ in range(iterations):
+        start_time = time.perf_counter()
         matrix_a = tf.random.normal((matrix_size, matrix_size))
         matrix_b = tf.random.normal((matrix_size, matrix_size))
         result = tf.linalg.matmul(matrix_a, matrix_b)
-        score = tf.reduce_mean(result)
+        # Converting the score waits for the GPU, otherwise only the time to queue the operations would be measured
+        score = float(tf.reduce_mean(result))
         scores.append(score)
+        benchmark_worker.emit_sample("Matrix Multiply iteration (ms)", (time.perf_counter() - start_time) * 1000)
 
     average_score = tf.reduce_mean(scores)
 
@@ -133,11 +140,13 @@ def run_elementwise_multiply_benchmark(benchmark_worker):
 
     scores = []
     for _ in range(iterations):
+        start_time = time.perf_counter()
         vector_a = tf.random.normal((vector_size,))
         vector_b = tf.random.normal((vector_size,))
         result = tf.multiply(vector_a, vector_b)
-        score = tf.reduce_mean(result)
+        score = float(tf.reduce_mean(result))
         scores.append(score)
+        benchmark_worker.emit_sample("Elementwise Multiply iteration (ms)", (time.perf_counter() - start_time) * 1000)
 
     average_score = tf.reduce_mean(scores)
 
@@ -170,11 +179,13 @@ def run_convolution_benchmark(benchmark_worker):
 
     scores = []
     for _ in range(iterations):
+        start_time = time.perf_counter()
         image = tf.random.normal((1, image_size, image_size, 3))
         kernel = tf.random.normal((kernel_size, kernel_size, 3, 64))
         result = tf.nn.conv2d(image, kernel, strides=(1, 1), padding='SAME')
-        score = tf.reduce_mean(result)
+        score = float(tf.reduce_mean(result))
         scores.append(score)
+        benchmark_worker.emit_sample("Convolution iteration (ms)", (time.perf_counter() - start_time) * 1000)
 
     average_score = tf.reduce_mean(scores)
 
@@ -204,11 +215,13 @@ def run_custom_operation_benchmark(benchmark_worker):
 
     scores = []
     for _ in range(iterations):
+        start_time = time.perf_counter()
         input_data = tf.random.normal((input_size,))
         weights = tf.random.normal((input_size,))
         result = tf.reduce_sum(tf.square(tf.multiply(input_data, weights)))
-        score = tf.reduce_mean(result)
+        score = float(tf.reduce_mean(result))
         scores.append(score)
+        benchmark_worker.emit_sample("Custom Operation iteration (ms)", (time.perf_counter() - start_time) * 1000)
 
     average_score = tf.reduce_mean(scores)
 
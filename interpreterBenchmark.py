@@ -0,0 +1,328 @@
+import gc
+import time
+
+from netBenchmark import percentile
+from wattage import measure_wattage
+
+
+# Operations per timing loop, and how many times each loop is repeated (the fastest repeat is kept)
+LOOP_COUNT = 1_000_000
+REPEATS = 5
+PIPELINE_SIZE = 1_000_000
+GC_HEAP_SIZES = [10_000, 100_000, 1_000_000]
+
+
+class PlainObject:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def method(self, a, b):
+        return a
+
+
+class SlotsObject:
+    __slots__ = ("x", "y")
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class Node:
+    def __init__(self, parent):
+        self.parent = parent
+        self.children = []
+
+
+def function(a, b):
+    return a
+
+
+"""
+Times a loop body several times and returns the fastest run in nanoseconds per operation, minus the cost of an empty
+loop so only the operation itself is measured.
+
+Args:
+    loop (function): Runs the operation count times, called as loop(count), or loop(count, state) with a setup.
+    count (int): The number of operations per run.
+    overhead (float): The empty loop cost to subtract, in nanoseconds per iteration.
+    setup (function): Called as setup(count) before every run, outside the timing, to build what the loop works on
+        (e.g. the container it deletes from).
+
+Returns:
+    float: Nanoseconds per operation.
+"""
+def time_per_operation(loop, count=LOOP_COUNT, overhead=0.0, setup=None):
+    best = float("inf")
+    for _ in range(REPEATS):
+        if setup is None:
+            start_time = time.perf_counter()
+            loop(count)
+        else:
+            state = setup(count)
+            start_time = time.perf_counter()
+            loop(count, state)
+        best = min(best, time.perf_counter() - start_time)
+    return round(max(best * 1e9 / count - overhead, 0.0), 3)
+
+
+def _empty_loop(count):
+    for _ in range(count):
+        pass
+
+
+"""
+Measures the cost of calling a plain function and a bound method.
+
+Returns:
+    dict: Nanoseconds per function and method call, under "calls".
+"""
+def run_call_benchmark(overhead):
+    def call_function(count):
+        f = function
+        for _ in range(count):
+            f(1, 2)
+
+    def call_method(count):
+        instance = PlainObject(1, 2)
+        for _ in range(count):
+            instance.method(1, 2)
+
+    return {"calls": {
+        "function_ns": time_per_operation(call_function, overhead=overhead),
+        "method_ns": time_per_operation(call_method, overhead=overhead),
+    }}
+
+
+"""
+Measures reading and writing an attribute on a regular class (stored in the instance __dict__) and on a class with
+__slots__ (stored in a fixed slot on the instance).
+
+Returns:
+    dict: Nanoseconds per attribute read and write for each kind of class, under "attribute_access".
+"""
+def run_attribute_benchmark(overhead):
+    def read(instance):
+        def loop(count):
+            for _ in range(count):
+                instance.x
+        return loop
+
+    def write(instance):
+        def loop(count):
+            for i in range(count):
+                instance.x = i
+        return loop
+
+    plain = PlainObject(1, 2)
+    slots = SlotsObject(1, 2)
+    return {"attribute_access": {
+        "plain_read_ns": time_per_operation(read(plain), overhead=overhead),
+        "slots_read_ns": time_per_operation(read(slots), overhead=overhead),
+        "plain_write_ns": time_per_operation(write(plain), overhead=overhead),
+        "slots_write_ns": time_per_operation(write(slots), overhead=overhead),
+    }}
+
+
+"""
+Measures inserting, looking up and removing integer keys in a dict and a set.
+
+Returns:
+    dict: Nanoseconds per operation, under "dict" and "set".
+"""
+def run_container_benchmark(overhead):
+    def dict_set(count):
+        d = {}
+        for i in range(count):
+            d[i] = i
+
+    def dict_get(count):
+        d = dict.fromkeys(range(1024), 0)
+        for i in range(count):
+            d[i & 1023]
+
+    def dict_delete(count, d):
+        for i in range(count):
+            del d[i]
+
+    def set_add(count):
+        s = set()
+        for i in range(count):
+            s.add(i)
+
+    def set_contains(count):
+        s = set(range(1024))
+        for i in range(count):
+            i & 1023 in s
+
+    def set_discard(count, s):
+        for i in range(count):
+            s.discard(i)
+
+    return {
+        "dict": {
+            "set_ns": time_per_operation(dict_set, overhead=overhead),
+            "get_ns": time_per_operation(dict_get, overhead=overhead),
+            "delete_ns": time_per_operation(
+                dict_delete, overhead=overhead, setup=lambda count: dict.fromkeys(range(count), 0)
+            ),
+        },
+        "set": {
+            "add_ns": time_per_operation(set_add, overhead=overhead),
+            "contains_ns": time_per_operation(set_contains, overhead=overhead),
+            "discard_ns": time_per_operation(set_discard, overhead=overhead, setup=lambda count: set(range(count))),
+        },
+    }
+
+
+"""
+Measures how many objects per second can be created and thrown away, for regular and __slots__ classes.
+
+Returns:
+    dict: Allocations per second for each kind of class, under "allocation".
+"""
+def run_allocation_benchmark(overhead):
+    def allocate(cls):
+        def loop(count):
+            for i in range(count):
+                cls(i, i)
+        return loop
+
+    results = {}
+    for name, cls in (("plain", PlainObject), ("slots", SlotsObject)):
+        nanoseconds = time_per_operation(allocate(cls), overhead=overhead)
+        results["{}_per_s".format(name)] = round(1e9 / nanoseconds, 3) if nanoseconds else 0.0
+    return {"allocation": results}
+
+
+"""
+Runs the same filter/map/sum pipeline built from generators and from intermediate lists.
+
+Returns:
+    dict: Milliseconds per pipeline for each approach.
+"""
+def run_pipeline_benchmark():
+    def generator_pipeline(count):
+        squares = (x * x for x in range(PIPELINE_SIZE))
+        odd = (x for x in squares if x & 1)
+        sum(x + 1 for x in odd)
+
+    def list_pipeline(count):
+        squares = [x * x for x in range(PIPELINE_SIZE)]
+        odd = [x for x in squares if x & 1]
+        sum([x + 1 for x in odd])
+
+    # time_per_operation with count=1 returns the time of the whole pipeline in nanoseconds
+    return {
+        "generator_ms": round(time_per_operation(generator_pipeline, count=1) / 1e6, 3),
+        "list_ms": round(time_per_operation(list_pipeline, count=1) / 1e6, 3),
+    }
+
+
+"""
+Measures garbage collection pauses while a heap of heap_size container objects (a tree of Nodes, each with a back
+reference to its parent) is built, and the time of a full collection once it is complete.
+
+Args:
+    heap_size (int): The number of objects in the heap.
+
+Returns:
+    dict: The number of automatic collections, their p50/p99/max pause and the full collection time in milliseconds.
+"""
+def run_gc_benchmark(heap_size):
+    pauses = []
+    pause_start = [0.0]
+
+    def on_collection(phase, info):
+        if phase == "start":
+            pause_start[0] = time.perf_counter()
+        else:
+            pauses.append(time.perf_counter() - pause_start[0])
+
+    gc.collect()
+    gc.callbacks.append(on_collection)
+    try:
+        root = Node(None)
+        nodes = [root]
+        for i in range(heap_size - 1):
+            parent = nodes[i // 8]
+            node = Node(parent)
+            parent.children.append(node)
+            nodes.append(node)
+        automatic_pauses = list(pauses)
+
+        start_time = time.perf_counter()
+        gc.collect()
+        full_collection = time.perf_counter() - start_time
+    finally:
+        gc.callbacks.remove(on_collection)
+
+    del root, nodes
+    gc.collect()
+
+    return {
+        "collections": len(automatic_pauses),
+        "pause_ms": {
+            "p50": round(percentile(automatic_pauses, 50) * 1000, 4),
+            "p99": round(percentile(automatic_pauses, 99) * 1000, 4),
+            "max": round(percentile(automatic_pauses, 100) * 1000, 4),
+        },
+        "full_collection_ms": round(full_collection * 1000, 4),
+    }
+
+
+"""
+Runs the Python interpreter benchmark: the cost of function and method calls, attribute access on regular and __slots__
+classes, dict and set operations, the object allocation rate, generator vs list pipelines and garbage collection
+pauses at growing heap sizes. Unlike the CPU benchmark, which only reports the total time of fibonacci(35), every
+number here isolates one part of the interpreter.
+
+Args:
+    progress_callback: An object that allows the function to update the progress of the test.
+
+Returns:
+    tuple: The benchmark results, the total score (the sum of every per-operation time in nanoseconds, lower is better)
+    and the total wattage.
+"""
+def perform_interpreter_benchmark(progress_callback):
+    benchmark_results = {}
+
+    steps = [
+        ("Function and Method Calls", run_call_benchmark),
+        ("Attribute Access", run_attribute_benchmark),
+        ("Dict and Set Operations", run_container_benchmark),
+        ("Object Allocation", run_allocation_benchmark),
+    ]
+    total_steps = len(steps) + 1 + len(GC_HEAP_SIZES)
+
+    overhead = time_per_operation(_empty_loop)
+
+    for index, (label, benchmark) in enumerate(steps):
+        progress_callback.emit_current_test_info("Running Interpreter Benchmark: {}".format(label))
+        benchmark_results.update(benchmark(overhead))
+        progress_callback.update_progress(int((index + 1) / total_steps * 100))
+
+    progress_callback.emit_current_test_info("Running Interpreter Benchmark: Generator vs List Pipelines")
+    benchmark_results["pipelines"] = run_pipeline_benchmark()
+    progress_callback.update_progress(int((len(steps) + 1) / total_steps * 100))
+
+    benchmark_results["gc"] = {}
+    for index, heap_size in enumerate(GC_HEAP_SIZES):
+        progress_callback.emit_current_test_info("Running Interpreter Benchmark: GC Pauses ({} objects)".format(heap_size))
+        result = run_gc_benchmark(heap_size)
+        benchmark_results["gc"]["heap_{}".format(heap_size)] = result
+        progress_callback.emit_sample("Full GC pause (ms)", result["full_collection_ms"])
+        progress_callback.update_progress(int((len(steps) + 2 + index) / total_steps * 100))
+
+    print("Interpreter Benchmark completed.")
+
+    total_score = sum(
+        value
+        for test in benchmark_results.values()
+        for metric, value in test.items()
+        if metric.endswith("_ns")
+    )
+    total_wattage = measure_wattage()
+
+    return benchmark_results, round(total_score, 3), total_wattage
@@ -0,0 +1,203 @@
+import multiprocessing
+import os
+import signal
+import traceback
+
+
+class BenchmarkCancelled(Exception):
+    pass
+
+
+class IsolatedBenchmarkError(RuntimeError):
+    pass
+
+
+class PipeProgress:
+    """
+    Stands in for the BenchmarkWorker inside the child process and forwards progress updates over the pipe.
+    Progress and test info are only sent when they change, so busy polling loops in the benchmarks don't flood the pipe.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.progress = None
+        self.test_info = None
+
+    def update_progress(self, progress):
+        if progress != self.progress:
+            self.progress = progress
+            self.connection.send(("progress", progress))
+
+    def emit_current_test_info(self, test_info):
+        if test_info != self.test_info:
+            self.test_info = test_info
+            self.connection.send(("info", test_info))
+
+    def emit_sample(self, label, value):
+        self.connection.send(("sample", (label, value)))
+
+
+"""
+Entry point of the child process. Puts the child in its own process group (so any multiprocessing pool it creates can
+be cancelled with it), applies the CPU affinity and niceness, runs the benchmark and sends the result back.
+
+Args:
+    connection (Connection): The child end of the pipe.
+    benchmark_fn (function): The benchmark entry point to run.
+    cores (list): The CPU cores to pin the benchmark to, or None to leave the affinity alone.
+    niceness (int): The niceness increment to apply, or None.
+"""
+def _run_child(connection, benchmark_fn, cores, niceness):
+    try:
+        if hasattr(os, "setpgrp"):
+            os.setpgrp()
+
+        if cores:
+            if hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(0, cores)
+            else:
+                print("CPU affinity is not supported on this platform, running unpinned")
+
+        if niceness:
+            os.nice(niceness)
+
+        result = benchmark_fn(PipeProgress(connection))
+        connection.send(("result", result))
+    except BaseException:
+        connection.send(("error", traceback.format_exc()))
+    finally:
+        connection.close()
+
+
+class IsolatedRun:
+    """
+    Runs a single benchmark in a fresh child process so that cancelling it cannot leave pools, TF sessions or large
+    allocations behind in the GUI process, and so that no state leaks from one run into the next.
+
+    Args:
+        benchmark_fn (function): The benchmark entry point, e.g. perform_cpu_benchmark. It must be importable
+            (a module level function) as it is sent to the child by reference.
+        cores (list): The CPU cores to pin the child to.
+        niceness (int): The niceness increment applied in the child.
+    """
+
+    def __init__(self, benchmark_fn, cores=None, niceness=None):
+        self.benchmark_fn = benchmark_fn
+        self.cores = cores
+        self.niceness = niceness
+        self.process = None
+        self.cancelled = False
+
+    """
+    Starts the child and relays its progress to the given callback until it returns a result.
+
+    Args:
+        progress_callback: The object the progress and current test info are forwarded to.
+
+    Returns:
+        tuple: The benchmark results, total score and total wattage from the child.
+    """
+    def run(self, progress_callback):
+        # spawn rather than fork, forking a process that is running Qt threads is not safe
+        context = multiprocessing.get_context("spawn")
+        parent_connection, child_connection = context.Pipe(duplex=False)
+
+        self.process = context.Process(
+            target=_run_child,
+            args=(child_connection, self.benchmark_fn, self.cores, self.niceness),
+        )
+        self.process.start()
+        child_connection.close()
+
+        try:
+            while True:
+                if self.cancelled:
+                    raise BenchmarkCancelled()
+
+                if not parent_connection.poll(0.1):
+                    if not self.process.is_alive() and not parent_connection.poll():
+                        raise IsolatedBenchmarkError(
+                            "Benchmark process exited with code {}".format(self.process.exitcode)
+                        )
+                    continue
+
+                try:
+                    kind, value = parent_connection.recv()
+                except EOFError:
+                    if self.cancelled:
+                        raise BenchmarkCancelled()
+                    raise IsolatedBenchmarkError("Benchmark process closed the pipe without a result")
+
+                if kind == "progress":
+                    progress_callback.update_progress(value)
+                elif kind == "info":
+                    progress_callback.emit_current_test_info(value)
+                elif kind == "sample":
+                    progress_callback.emit_sample(*value)
+                elif kind == "result":
+                    return value
+                elif kind == "error":
+                    raise IsolatedBenchmarkError(value)
+        finally:
+            parent_connection.close()
+            self.process.join(5)
+            if self.process.is_alive():
+                self._kill(signal.SIGKILL)
+                self.process.join()
+
+    """
+    Cancels the run by terminating the child and everything in its process group.
+    """
+    def cancel(self):
+        self.cancelled = True
+        if self.process is not None and self.process.is_alive():
+            self._kill(signal.SIGTERM)
+
+    def _kill(self, sig):
+        try:
+            # Only signal the group once the child has moved into its own, otherwise we would signal ourselves
+            if hasattr(os, "killpg") and os.getpgid(self.process.pid) == self.process.pid:
+                os.killpg(self.process.pid, sig)
+            elif sig == signal.SIGKILL:
+                self.process.kill()
+            else:
+                self.process.terminate()
+        except ProcessLookupError:
+            pass
+
+
+"""
+Returns the line of an error worth showing: the last line of a child's traceback, or the error's type if it has no
+message.
+
+Args:
+    error (Exception): The error a benchmark failed with.
+
+Returns:
+    str: The summary.
+"""
+def error_summary(error):
+    lines = str(error).strip().splitlines()
+    return lines[-1] if lines else type(error).__name__
+
+
+"""
+Parses a list of CPU cores such as "0-3,6" into a list of core numbers.
+
+Args:
+    text (str): The comma separated cores and ranges.
+
+Returns:
+    list: The core numbers, or None if the text is empty.
+"""
+def parse_core_list(text):
+    cores = []
+    for part in text.replace(" ", "").split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cores.extend(range(int(start), int(end) + 1))
+        else:
+            cores.append(int(part))
+    return cores or None
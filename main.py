@@ -1,81 +1,213 @@
-from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel, QPushButton, QProgressBar, QTabWidget
-from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel, QPushButton, QProgressBar, QTabWidget, QCheckBox, QLineEdit, QSpinBox, QHBoxLayout, QComboBox
+from PyQt6.QtCore import QThread, QTimer, pyqtSignal
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import matplotlib.pyplot as plt
-
-from cpuBenchmark import perform_cpu_benchmark
-from gpuBenchmark import perform_gpu_benchmark
-from ramBenchmark import perform_ram_benchmark
-from ssdBenchmark import perform_ssd_benchmark
-from neBenchmark import perform_neural_engine_benchmark
+import collections
+import functools
+import os
+
+# The suites are loaded lazily through LazySuite, isolated children re-import this script and would otherwise all
+# start by importing TensorFlow
+from stressBenchmark import perform_stress_benchmark, STRESS_INTENSITY, WORKLOADS
+from soak import perform_soak_benchmark, SOAK_DURATION
 from wattage import measure_wattage
+from telemetry import TELEMETRY_INTERVAL
+from isolation import BenchmarkCancelled, IsolatedBenchmarkError, error_summary, parse_core_list
+from scheduler import SUITES, RUN_LOCK, LazySuite, run_schedule, run_suite
+from exporter import to_records, write_textfile, write_csv, write_jsonl, serve_metrics
+from profiling import PROFILE_MODES, PROFILE_DIRECTORY
+from memory import MemoryCeilingExceeded
+
+# How often progress, test info and samples are pushed to the GUI, updates in between are coalesced
+UI_REFRESH_HZ = 10
+# Where "Export Results" writes the OpenMetrics, CSV and JSON Lines files
+RESULTS_DIRECTORY = "results"
+# Set this to a node_exporter textfile collector path to have it rewritten after every benchmark
+TEXTFILE_COLLECTOR_PATH = os.environ.get("BENCHMARK_TEXTFILE_COLLECTOR")
+METRICS_PORT = 9101
+# How long a cancelled in-process benchmark gets to stop at its next progress report before its thread is terminated
+STOP_TIMEOUT_MS = 5000
 
 
 class BenchmarkWorker(QThread):
     benchmark_finished = pyqtSignal(dict, float, float)
+    benchmark_failed = pyqtSignal(str)
     progress_update = pyqtSignal(int)
     current_test_info = pyqtSignal(str)
+    samples_ready = pyqtSignal(list)
 
-    def __init__(self, benchmark_fn, test_name):
+    def __init__(self, benchmark_fn, test_name, options=None):
         super().__init__()
         self.benchmark_fn = benchmark_fn
         self.test_name = test_name
+        self.options = options or {}
         self.progress = 0
+        self.test_info = None
+        self.pending_samples = collections.deque()
+        self.isolated_run = None
+        self.cancelled = False
+
+        # The benchmark only records its state, this timer lives in the GUI thread and pushes it to the widgets at a
+        # fixed rate, so a benchmark reporting progress in a tight loop costs the GUI (and the measurement) nothing
+        self.emitted_progress = None
+        self.emitted_test_info = None
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(1000 // UI_REFRESH_HZ)
+        self.refresh_timer.timeout.connect(self.flush_updates)
+        self.started.connect(self.refresh_timer.start)
+        self.finished.connect(self.refresh_timer.stop)
+        self.finished.connect(self.flush_updates)
 
    
     def run(self):
         print("Benchmark started:", self.test_name)
-        benchmark_results, total_score, total_wattage = self.benchmark_fn(self)
+        try:
+            benchmark_results, total_score, total_wattage = self.execute(self.benchmark_fn)
+        except BenchmarkCancelled:
+            print("Benchmark cancelled:", self.test_name)
+            return
+        except (IsolatedBenchmarkError, MemoryCeilingExceeded) as error:
+            print("Benchmark failed:", self.test_name)
+            print(error)
+            self.benchmark_failed.emit(error_summary(error))
+            return
         print("Benchmark finished:", self.test_name)
         self.benchmark_finished.emit(benchmark_results, total_score, total_wattage)
 
+
+    """
+    Runs a benchmark function with the optional extras from the run options applied (e.g. telemetry sampling,
+    profiling and running the benchmark in its own pinned child process).
+
+    :param benchmark_fn: The benchmark entry point to run.
+    :return: A tuple containing the benchmark results, total score and total wattage.
+    """
+    def execute(self, benchmark_fn):
+        if self.cancelled:
+            raise BenchmarkCancelled()
+        return run_suite(benchmark_fn, self, self.options, on_isolated_run=self.set_isolated_run)
+
+
+    def set_isolated_run(self, isolated_run):
+        self.isolated_run = isolated_run
+        if self.cancelled:
+            isolated_run.cancel()
+
    
     """
-    Updates the progress of the benchmark and emits a signal with the updated progress.
+    Updates the progress of the benchmark, it is sent to the GUI on the next refresh.
 
     :param progress: An integer representing the progress of the benchmark.
     """
     def update_progress(self, progress):
+        self.check_cancelled()
         self.progress = progress
-        self.progress_update.emit(progress)
 
    
     """
-    Emits a signal with the current test information.
+    Updates the current test information, it is sent to the GUI on the next refresh.
 
     :param test_info: A string containing the current test information.
     """
     def emit_current_test_info(self, test_info):
-        self.current_test_info.emit(test_info)
+        self.check_cancelled()
+        self.test_info = test_info
+
+
+    """
+    Records a single measurement (e.g. the time of one iteration) for the live graph.
+
+    :param label: The name of the series the sample belongs to.
+    :param value: The measured value.
+    """
+    def emit_sample(self, label, value):
+        self.check_cancelled()
+        self.pending_samples.append((label, value))
 
-    "I feel like this is self explanatory"
+
+    """
+    Stops an in-process benchmark at its next progress report once it has been cancelled. The exception unwinds the
+    benchmark, so it can terminate its pools and free its memory on the way out.
+    """
+    def check_cancelled(self):
+        if self.cancelled:
+            raise BenchmarkCancelled()
+
+
+    """
+    Emits the progress and test info if they changed since the last refresh, and every sample recorded since then in a
+    single signal. Runs in the GUI thread.
+    """
+    def flush_updates(self):
+        if self.progress != self.emitted_progress:
+            self.emitted_progress = self.progress
+            self.progress_update.emit(self.progress)
+
+        if self.test_info is not None and self.test_info != self.emitted_test_info:
+            self.emitted_test_info = self.test_info
+            self.current_test_info.emit(self.test_info)
+
+        samples = []
+        while self.pending_samples:
+            samples.append(self.pending_samples.popleft())
+        if samples:
+            self.samples_ready.emit(samples)
+
+    """
+    Stops the benchmark. Isolated runs are cancelled by killing their child process, which leaves nothing behind in
+    this process. In-process runs stop at their next progress report, and the thread is only terminated if that does
+    not happen within STOP_TIMEOUT_MS (e.g. the benchmark is stuck in a long TensorFlow call).
+    """
     def stop(self):
-        self.terminate()
+        self.cancelled = True
+        if self.isolated_run is not None:
+            self.isolated_run.cancel()
+            self.wait()
+        elif not self.wait(STOP_TIMEOUT_MS):
+            self.terminate()
+            self.wait()
 
 
 class BenchmarkWidget(QWidget):
     benchmark_finished = pyqtSignal(dict, float, float)
 
-    def __init__(self, benchmark_fn, label_text):
+    def __init__(self, benchmark_fn, label_text, options=None):
         super().__init__()
 
         self.benchmark_fn = benchmark_fn
         self.label_text = label_text
+        self.options = options if options is not None else {}
 
         self.current_test_label = QLabel("Current Test: ")
         self.progress_bar = QProgressBar()
         self.progress_label = QLabel("0%")
         self.score_label = QLabel("Score: N/A")
         self.wattage_label = QLabel("Wattage: N/A")
-
-        self.fig = plt.Figure(figsize=(5, 4), dpi=100)
-        self.graph = self.fig.add_subplot(111)
+        self.telemetry_label = QLabel("")
+        self.profile_label = QLabel("")
+        self.memory_label = QLabel("")
+
+        self.fig = plt.Figure(figsize=(5, 6), dpi=100)
+        self.live_graph = self.fig.add_subplot(211)
+        self.live_graph.set_title("Live Samples")
+        self.live_graph.set_xlabel("Iteration")
+        self.live_graph.set_ylabel("Value")
+        self.live_graph.grid()
+
+        self.graph = self.fig.add_subplot(212)
         self.graph.set_title("Benchmark Results")
         self.graph.set_xlabel("Run")
         self.graph.set_ylabel("Score")
         self.graph.grid()
+        self.score_line, = self.graph.plot([], [], marker='o')
+        self.fig.tight_layout()
 
         self.canvas = FigureCanvas(self.fig)
+        # The live lines are animated, so a full draw leaves them out and we can cache the background to blit onto
+        self.live_lines = {}
+        self.live_data = {}
+        self.live_background = None
+        self.canvas.mpl_connect("draw_event", self.cache_live_background)
 
         self.run_button = QPushButton("Run Benchmark")
         self.run_button.clicked.connect(self.run_benchmark)
@@ -87,6 +219,9 @@ class BenchmarkWidget(QWidget):
         self.layout.addWidget(self.progress_label)
         self.layout.addWidget(self.score_label)
         self.layout.addWidget(self.wattage_label)
+        self.layout.addWidget(self.telemetry_label)
+        self.layout.addWidget(self.profile_label)
+        self.layout.addWidget(self.memory_label)
         self.layout.addWidget(self.canvas)
         self.layout.addWidget(self.run_button)
 
@@ -102,15 +237,28 @@ class BenchmarkWidget(QWidget):
     results. The benchmark score is stored and the graph is updated with the latest score.
     """
     def run_benchmark(self):
+        # Only one benchmark may run at a time, otherwise they distort each other's results
+        if not RUN_LOCK.acquire(blocking=False):
+            self.current_test_label.setText("Another benchmark is already running")
+            return
+
         self.run_button.setEnabled(False)
         self.run_button.setText("Running...")
         self.progress_bar.setValue(0)  # Reset progress bar
         self.progress_label.setText("0%")  # Reset progress label
 
-        self.benchmark_worker = BenchmarkWorker(self.benchmark_fn, self.label_text)
+        self.telemetry_label.setText("")
+        self.profile_label.setText("")
+        self.memory_label.setText("")
+        self.reset_live_graph()
+
+        self.benchmark_worker = BenchmarkWorker(self.benchmark_fn, self.label_text, self.options)
         self.benchmark_worker.current_test_info.connect(self.current_test_label.setText)
         self.benchmark_worker.progress_update.connect(self.update_progress)
+        self.benchmark_worker.samples_ready.connect(self.add_live_samples)
         self.benchmark_worker.benchmark_finished.connect(self.handle_benchmark_finished)
+        self.benchmark_worker.benchmark_failed.connect(self.handle_benchmark_failed)
+        self.benchmark_worker.finished.connect(RUN_LOCK.release)
 
         self.benchmark_worker.start()
 
@@ -132,6 +280,9 @@ class BenchmarkWidget(QWidget):
         self.run_button.setEnabled(True)
         self.run_button.setText("Run Benchmark")
         self.benchmark_finished.emit(benchmark_results, total_score, total_wattage)
+        self.update_telemetry(benchmark_results.get("telemetry"))
+        self.update_profile(benchmark_results.get("profile"))
+        self.update_memory(benchmark_results.get("memory"))
 
         # Store the score and update the graph
         self.scores.append(total_score)
@@ -139,6 +290,86 @@ class BenchmarkWidget(QWidget):
 
 
 
+    """
+    Handles a benchmark that failed in its child process by re-enabling the run button and showing the error.
+
+    Args:
+        error (str): The last line of the error raised by the benchmark.
+
+    Returns:
+        None
+    """
+    def handle_benchmark_failed(self, error):
+        self.run_button.setEnabled(True)
+        self.run_button.setText("Run Benchmark")
+        self.current_test_label.setText("Benchmark failed: " + error)
+
+
+
+    """
+    Shows whether the telemetry collected during the run points to throttling or external load, in which case the
+    score should not be trusted.
+
+    Args:
+        telemetry (dict): The telemetry report attached to the results, or None if sampling was off.
+
+    Returns:
+        None
+    """
+    def update_telemetry(self, telemetry):
+        if not telemetry:
+            self.telemetry_label.setText("")
+        elif telemetry["throttled"] or telemetry["external_load"]:
+            self.telemetry_label.setText("Warning: " + "; ".join(telemetry["reasons"]))
+        else:
+            self.telemetry_label.setText("Telemetry: no throttling detected ({}% overhead)".format(telemetry["overhead_percent"]))
+
+
+
+    """
+    Shows where the profile of a profiled run was saved, and that its score is not comparable with normal runs.
+
+    Args:
+        profile (dict): The profile details attached to the results, or None if profiling was off.
+
+    Returns:
+        None
+    """
+    def update_profile(self, profile):
+        if not profile:
+            self.profile_label.setText("")
+        else:
+            self.profile_label.setText("Profiled run ({} mode, {}% overhead), not comparable with normal runs: {}".format(
+                profile["mode"], profile["overhead_percent"], profile["files"]["collapsed"]
+            ))
+
+
+
+    """
+    Shows the memory footprint of the run.
+
+    Args:
+        memory (dict): The memory footprint attached to the results.
+
+    Returns:
+        None
+    """
+    def update_memory(self, memory):
+        if not memory:
+            self.memory_label.setText("")
+        else:
+            self.memory_label.setText(
+                "Memory: peak RSS {:.0f} MB (from {:.0f} MB), peak anon {:.0f} MB, {} page faults ({} major)".format(
+                    memory["peak_rss_bytes"] / 1024 ** 2,
+                    memory["start_rss_bytes"] / 1024 ** 2,
+                    memory["peak_anon_bytes"] / 1024 ** 2,
+                    memory["minor_page_faults"] + memory["major_page_faults"],
+                    memory["major_page_faults"],
+                )
+            )
+
+
+
     """
     Updates the progress bar and progress label with the given progress value.
 
@@ -162,16 +393,316 @@ class BenchmarkWidget(QWidget):
         None
     """
     def update_graph(self):
-            self.graph.clear()
-
             runs = range(1, len(self.scores) + 1)
-            self.graph.plot(runs, self.scores, marker='o')
-            self.graph.set_title("Benchmark Results")
-            self.graph.set_xlabel("Run")
-            self.graph.set_ylabel("Score")
-            self.graph.grid()
+            self.score_line.set_data(runs, self.scores)
+            self.graph.relim()
+            self.graph.autoscale_view()
+
+            self.canvas.draw_idle()
 
+
+    """
+    Removes the live samples of the previous run from the live graph.
+
+    Returns:
+        None
+    """
+    def reset_live_graph(self):
+        for line in self.live_lines.values():
+            line.remove()
+        self.live_lines = {}
+        self.live_data = {}
+        if self.live_graph.get_legend():
+            self.live_graph.get_legend().remove()
+        self.live_graph.relim()
+        self.canvas.draw_idle()
+
+
+    def cache_live_background(self, event):
+        self.live_background = self.canvas.copy_from_bbox(self.live_graph.bbox)
+        self.draw_live_lines()
+
+
+    def draw_live_lines(self):
+        for line in self.live_lines.values():
+            self.live_graph.draw_artist(line)
+        self.canvas.blit(self.live_graph.bbox)
+
+
+    """
+    Appends a batch of samples to the live graph. Only the changed lines are updated with set_data and blitted onto
+    the cached background, the whole figure is only redrawn when a new series appears or the samples no longer fit in
+    the current axis limits.
+
+    Args:
+        samples (list): (label, value) tuples recorded since the last refresh.
+
+    Returns:
+        None
+    """
+    def add_live_samples(self, samples):
+        full_redraw = self.live_background is None
+        x_min, x_max = self.live_graph.get_xlim()
+        y_min, y_max = self.live_graph.get_ylim()
+
+        for label, value in samples:
+            if label not in self.live_lines:
+                line, = self.live_graph.plot([], [], label=label, animated=True)
+                self.live_lines[label] = line
+                self.live_data[label] = ([], [])
+                self.live_graph.legend(loc="upper left", fontsize="small")
+                full_redraw = True
+
+            x_data, y_data = self.live_data[label]
+            x_data.append(len(x_data) + 1)
+            y_data.append(value)
+            if x_data[-1] > x_max or not y_min <= value <= y_max:
+                full_redraw = True
+
+        for label, line in self.live_lines.items():
+            line.set_data(*self.live_data[label])
+
+        if full_redraw:
+            # Leave headroom so the next samples can be blitted without rescaling straight away
+            self.live_graph.relim()
+            self.live_graph.autoscale_view()
+            x_min, x_max = self.live_graph.get_xlim()
+            y_min, y_max = self.live_graph.get_ylim()
+            self.live_graph.set_xlim(0, max(x_max * 1.5, 10))
+            self.live_graph.set_ylim(y_min - abs(y_min) * 0.25, y_max + abs(y_max) * 0.25)
             self.canvas.draw()
+        else:
+            self.canvas.restore_region(self.live_background)
+            self.draw_live_lines()
+
+
+class StressWidget(BenchmarkWidget):
+    """
+    A BenchmarkWidget for the stress test, with a worker count for each workload.
+    """
+
+    def __init__(self, options=None):
+        super().__init__(perform_stress_benchmark, "Stress Test", options)
+
+        intensity_layout = QHBoxLayout()
+        intensity_layout.addWidget(QLabel("Workers (0 to leave out):"))
+        self.intensity_spinboxes = {}
+        for name, (label, unit, workload) in WORKLOADS.items():
+            intensity_layout.addWidget(QLabel(label))
+            spinbox = QSpinBox()
+            spinbox.setRange(0, os.cpu_count() or 1)
+            spinbox.setValue(STRESS_INTENSITY[name])
+            self.intensity_spinboxes[name] = spinbox
+            intensity_layout.addWidget(spinbox)
+        self.layout.insertLayout(self.layout.indexOf(self.run_button), intensity_layout)
+
+
+    """
+    Runs the stress test with the worker counts currently selected.
+    """
+    def run_benchmark(self):
+        intensity = {name: spinbox.value() for name, spinbox in self.intensity_spinboxes.items()}
+        if not any(intensity.values()):
+            self.current_test_label.setText("Select at least one workload")
+            return
+
+        # update_wrapper keeps the name of the entry point, which the profiler uses to name its files
+        self.benchmark_fn = functools.update_wrapper(
+            functools.partial(perform_stress_benchmark, intensity=intensity), perform_stress_benchmark
+        )
+        super().run_benchmark()
+
+
+class SoakWidget(BenchmarkWidget):
+    """
+    A BenchmarkWidget for the soak test, with the workload and how long to run it for.
+    """
+
+    def __init__(self, options=None):
+        super().__init__(perform_soak_benchmark, "Soak Test", options)
+
+        soak_layout = QHBoxLayout()
+        soak_layout.addWidget(QLabel("Workload:"))
+        self.workload_combo = QComboBox()
+        for name, (label, unit, workload) in WORKLOADS.items():
+            self.workload_combo.addItem(label, name)
+        soak_layout.addWidget(self.workload_combo)
+
+        soak_layout.addWidget(QLabel("Duration (min):"))
+        self.duration_spinbox = QSpinBox()
+        self.duration_spinbox.setRange(1, 24 * 60)
+        self.duration_spinbox.setValue(SOAK_DURATION // 60)
+        soak_layout.addWidget(self.duration_spinbox)
+        self.layout.insertLayout(self.layout.indexOf(self.run_button), soak_layout)
+
+
+    """
+    Runs the soak test with the selected workload and duration.
+    """
+    def run_benchmark(self):
+        self.benchmark_fn = functools.update_wrapper(
+            functools.partial(
+                perform_soak_benchmark,
+                workload=self.workload_combo.currentData(),
+                duration=self.duration_spinbox.value() * 60,
+            ),
+            perform_soak_benchmark,
+        )
+        super().run_benchmark()
+
+
+class ScheduleWorker(BenchmarkWorker):
+    def __init__(self, suite_names, schedule_options, options=None):
+        super().__init__(None, "Run All", options)
+        self.suite_names = suite_names
+        self.schedule_options = schedule_options
+
+
+    def run(self):
+        print("Schedule started:", ", ".join(self.suite_names))
+        try:
+            report, total_score, total_wattage = run_schedule(
+                self.suite_names,
+                self,
+                run_fn=self.execute,
+                is_cancelled=lambda: self.cancelled,
+                **self.schedule_options
+            )
+        except BenchmarkCancelled:
+            print("Schedule cancelled")
+            return
+        except (IsolatedBenchmarkError, MemoryCeilingExceeded) as error:
+            print("Schedule failed")
+            print(error)
+            self.benchmark_failed.emit(error_summary(error))
+            return
+        print("Schedule finished")
+        self.benchmark_finished.emit(report, total_score, total_wattage)
+
+
+class RunAllWidget(QWidget):
+    benchmark_finished = pyqtSignal(dict, float, float)
+
+    def __init__(self, options=None):
+        super().__init__()
+
+        self.options = options if options is not None else {}
+
+        self.layout = QVBoxLayout(self)
+        self.layout.addWidget(QLabel("Run the selected benchmarks one after the other"))
+
+        self.suite_checkboxes = {}
+        for name, (label, module_name, function_name) in SUITES.items():
+            checkbox = QCheckBox(label)
+            checkbox.setChecked(True)
+            self.suite_checkboxes[name] = checkbox
+            self.layout.addWidget(checkbox)
+
+        settings_layout = QHBoxLayout()
+        settings_layout.addWidget(QLabel("Passes:"))
+        self.passes_spinbox = QSpinBox()
+        self.passes_spinbox.setRange(1, 100)
+        settings_layout.addWidget(self.passes_spinbox)
+
+        settings_layout.addWidget(QLabel("Cooldown (s):"))
+        self.cooldown_spinbox = QSpinBox()
+        self.cooldown_spinbox.setRange(0, 3600)
+        self.cooldown_spinbox.setValue(10)
+        settings_layout.addWidget(self.cooldown_spinbox)
+
+        self.shuffle_checkbox = QCheckBox("Shuffle order each pass")
+        self.shuffle_checkbox.setChecked(True)
+        settings_layout.addWidget(self.shuffle_checkbox)
+
+        self.wait_idle_checkbox = QCheckBox("Wait for idle system")
+        self.wait_idle_checkbox.setChecked(True)
+        settings_layout.addWidget(self.wait_idle_checkbox)
+        self.layout.addLayout(settings_layout)
+
+        self.current_test_label = QLabel("Current Test: ")
+        self.progress_bar = QProgressBar()
+        self.summary_label = QLabel("")
+        self.run_button = QPushButton("Run All")
+        self.run_button.clicked.connect(self.run_schedule)
+
+        self.layout.addWidget(self.current_test_label)
+        self.layout.addWidget(self.progress_bar)
+        self.layout.addWidget(self.summary_label)
+        self.layout.addStretch()
+        self.layout.addWidget(self.run_button)
+
+        self.benchmark_worker = None
+
+
+    """
+    Runs the selected suites with a ScheduleWorker. Like a single benchmark, the schedule holds the run lock for its
+    whole duration so nothing else can be started in between.
+    """
+    def run_schedule(self):
+        suite_names = [name for name, checkbox in self.suite_checkboxes.items() if checkbox.isChecked()]
+        if not suite_names:
+            self.current_test_label.setText("Select at least one benchmark")
+            return
+
+        if not RUN_LOCK.acquire(blocking=False):
+            self.current_test_label.setText("Another benchmark is already running")
+            return
+
+        self.run_button.setEnabled(False)
+        self.run_button.setText("Running...")
+        self.progress_bar.setValue(0)
+        self.summary_label.setText("")
+
+        schedule_options = {
+            "passes": self.passes_spinbox.value(),
+            "shuffle": self.shuffle_checkbox.isChecked(),
+            "cooldown": self.cooldown_spinbox.value(),
+            "wait_idle": self.wait_idle_checkbox.isChecked(),
+        }
+
+        self.benchmark_worker = ScheduleWorker(suite_names, schedule_options, self.options)
+        self.benchmark_worker.current_test_info.connect(self.current_test_label.setText)
+        self.benchmark_worker.progress_update.connect(self.progress_bar.setValue)
+        self.benchmark_worker.benchmark_finished.connect(self.handle_schedule_finished)
+        self.benchmark_worker.benchmark_failed.connect(self.handle_schedule_failed)
+        self.benchmark_worker.finished.connect(RUN_LOCK.release)
+
+        self.benchmark_worker.start()
+
+
+    """
+    Shows the mean and spread of each suite across the passes and forwards the combined report.
+
+    Args:
+        report (dict): The combined report from run_schedule.
+        total_score (float): The sum of each suite's mean score.
+        total_wattage (float): The total wattage of every run.
+
+    Returns:
+        None
+    """
+    def handle_schedule_finished(self, report, total_score, total_wattage):
+        self.run_button.setEnabled(True)
+        self.run_button.setText("Run All")
+        self.current_test_label.setText("Current Test: ")
+
+        lines = []
+        for name, summary in report["summary"].items():
+            lines.append("{}: {:.3f} ± {:.3f} (min {:.3f}, max {:.3f})".format(
+                SUITES[name][0], summary["mean"], summary["stdev"], summary["min"], summary["max"]
+            ))
+        for run in report["runs"]:
+            if "error" in run:
+                lines.append("{} (pass {}) failed: {}".format(SUITES[run["suite"]][0], run["pass"], run["error"]))
+        self.summary_label.setText("\n".join(lines))
+
+        self.benchmark_finished.emit(report, total_score, total_wattage)
+
+
+    def handle_schedule_failed(self, error):
+        self.run_button.setEnabled(True)
+        self.run_button.setText("Run All")
+        self.current_test_label.setText("Benchmark failed: " + error)
 
 
 class MainWindow(QMainWindow):
@@ -180,6 +711,21 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Apple System Benchmark")
         self.total_score = 0
         self.total_wattage = 0
+        self.result_records = []
+        self.metrics_server = None
+        # Shared with every BenchmarkWidget so the options apply to whichever benchmark is run next
+        self.run_options = {
+            "telemetry": False,
+            "telemetry_interval": TELEMETRY_INTERVAL,
+            # On by default, so that stopping a benchmark kills its whole process group instead of a thread
+            "isolate": True,
+            "cores": None,
+            "niceness": None,
+            "profile": None,
+            "profile_dir": PROFILE_DIRECTORY,
+            "profile_allocations": False,
+            "memory_ceiling_mb": None,
+        }
 
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
@@ -196,31 +742,103 @@ class MainWindow(QMainWindow):
         tab_widget = QTabWidget()
         self.layout.addWidget(tab_widget)
 
+        # Run Options
+        telemetry_checkbox = QCheckBox("Sample system telemetry (frequency, temperature, load) during runs")
+        telemetry_checkbox.toggled.connect(lambda checked: self.run_options.update(telemetry=checked))
+        self.layout.addWidget(telemetry_checkbox)
+
+        isolation_layout = QHBoxLayout()
+        isolate_checkbox = QCheckBox("Run each benchmark in its own process")
+        isolate_checkbox.setChecked(self.run_options["isolate"])
+        isolate_checkbox.toggled.connect(lambda checked: self.run_options.update(isolate=checked))
+        isolation_layout.addWidget(isolate_checkbox)
+
+        self.cores_edit = QLineEdit()
+        self.cores_edit.setPlaceholderText("Pin to cores, e.g. 0-3")
+        self.cores_edit.editingFinished.connect(self.update_cores)
+        isolation_layout.addWidget(self.cores_edit)
+
+        isolation_layout.addWidget(QLabel("Niceness:"))
+        niceness_spinbox = QSpinBox()
+        niceness_spinbox.setRange(0, 19)
+        niceness_spinbox.valueChanged.connect(lambda value: self.run_options.update(niceness=value or None))
+        isolation_layout.addWidget(niceness_spinbox)
+        self.layout.addLayout(isolation_layout)
+
+        profile_layout = QHBoxLayout()
+        profile_layout.addWidget(QLabel("Profiling:"))
+        profile_combo = QComboBox()
+        profile_combo.addItem("Off", None)
+        for mode in PROFILE_MODES:
+            profile_combo.addItem(mode, mode)
+        profile_combo.currentIndexChanged.connect(
+            lambda index: self.run_options.update(profile=profile_combo.itemData(index))
+        )
+        profile_layout.addWidget(profile_combo)
+
+        allocations_checkbox = QCheckBox("Trace allocations (slow)")
+        allocations_checkbox.toggled.connect(lambda checked: self.run_options.update(profile_allocations=checked))
+        profile_layout.addWidget(allocations_checkbox)
+
+        profile_layout.addWidget(QLabel("Memory ceiling (MB, 0 for none):"))
+        ceiling_spinbox = QSpinBox()
+        ceiling_spinbox.setRange(0, 1024 * 1024)
+        ceiling_spinbox.setSingleStep(256)
+        ceiling_spinbox.valueChanged.connect(lambda value: self.run_options.update(memory_ceiling_mb=value or None))
+        profile_layout.addWidget(ceiling_spinbox)
+        profile_layout.addStretch()
+        self.layout.addLayout(profile_layout)
+
         # CPU Benchmark
-        cpu_widget = BenchmarkWidget(perform_cpu_benchmark, "CPU Benchmark")
+        cpu_widget = BenchmarkWidget(LazySuite("cpu"), "CPU Benchmark", self.run_options)
         cpu_widget.benchmark_finished.connect(self.update_results)
         tab_widget.addTab(cpu_widget, "CPU")
 
         # GPU Benchmark
-        gpu_widget = BenchmarkWidget(perform_gpu_benchmark, "GPU Benchmark")
+        gpu_widget = BenchmarkWidget(LazySuite("gpu"), "GPU Benchmark", self.run_options)
         gpu_widget.benchmark_finished.connect(self.update_results)
         tab_widget.addTab(gpu_widget, "GPU")
 
         # RAM Benchmark
-        ram_widget = BenchmarkWidget(perform_ram_benchmark, "RAM Benchmark")
+        ram_widget = BenchmarkWidget(LazySuite("ram"), "RAM Benchmark", self.run_options)
         ram_widget.benchmark_finished.connect(self.update_results)
         tab_widget.addTab(ram_widget, "RAM")
 
         # SSD Benchmark
-        ssd_widget = BenchmarkWidget(perform_ssd_benchmark, "SSD Benchmark")
+        ssd_widget = BenchmarkWidget(LazySuite("ssd"), "SSD Benchmark", self.run_options)
         ssd_widget.benchmark_finished.connect(self.update_results)
         tab_widget.addTab(ssd_widget, "SSD")
 
         # Neural Engine Benchmark
-        neural_widget = BenchmarkWidget(perform_neural_engine_benchmark, "Neural Engine Benchmark")
+        neural_widget = BenchmarkWidget(LazySuite("neural_engine"), "Neural Engine Benchmark", self.run_options)
         neural_widget.benchmark_finished.connect(self.update_results)
         tab_widget.addTab(neural_widget, "Neural Engine")
 
+        # Network Benchmark
+        network_widget = BenchmarkWidget(LazySuite("network"), "Network Benchmark", self.run_options)
+        network_widget.benchmark_finished.connect(self.update_results)
+        tab_widget.addTab(network_widget, "Network")
+
+        # Interpreter Benchmark
+        interpreter_widget = BenchmarkWidget(LazySuite("interpreter"), "Interpreter Benchmark", self.run_options)
+        interpreter_widget.benchmark_finished.connect(self.update_results)
+        tab_widget.addTab(interpreter_widget, "Interpreter")
+
+        # Stress Test
+        stress_widget = StressWidget(self.run_options)
+        stress_widget.benchmark_finished.connect(self.update_results)
+        tab_widget.addTab(stress_widget, "Stress")
+
+        # Soak Test
+        soak_widget = SoakWidget(self.run_options)
+        soak_widget.benchmark_finished.connect(self.update_results)
+        tab_widget.addTab(soak_widget, "Soak")
+
+        # Run All
+        run_all_widget = RunAllWidget(self.run_options)
+        run_all_widget.benchmark_finished.connect(self.update_results)
+        tab_widget.addTab(run_all_widget, "Run All")
+
         self.layout.addStretch()
 
         # Total Score Label
@@ -231,8 +849,33 @@ class MainWindow(QMainWindow):
         self.total_wattage_label = QLabel("Total Wattage: 0")
         self.layout.addWidget(self.total_wattage_label)
 
+        # Export
+        export_layout = QHBoxLayout()
+        export_button = QPushButton("Export Results")
+        export_button.clicked.connect(self.export_results)
+        export_layout.addWidget(export_button)
+
+        metrics_checkbox = QCheckBox("Serve metrics on http://localhost:{}/metrics".format(METRICS_PORT))
+        metrics_checkbox.toggled.connect(self.toggle_metrics_server)
+        export_layout.addWidget(metrics_checkbox)
+        self.layout.addLayout(export_layout)
+
+        self.export_label = QLabel("")
+        self.layout.addWidget(self.export_label)
+
     
     
+    """
+    Parses the cores entered in the cores field into the run options, ignoring invalid input.
+    """
+    def update_cores(self):
+        try:
+            self.run_options["cores"] = parse_core_list(self.cores_edit.text())
+        except ValueError:
+            self.cores_edit.setText("")
+            self.run_options["cores"] = None
+
+
     """
     Updates the total score and total wattage labels with the given benchmark results, total score, and total wattage.
 
@@ -243,6 +886,8 @@ class MainWindow(QMainWindow):
     """
     def update_results(self, benchmark_results, total_score, total_wattage):
         if benchmark_results:
+            self.record_results(self.sender(), benchmark_results, total_score, total_wattage)
+
             individual_scores = benchmark_results
             self.total_score += total_score
             self.total_wattage += total_wattage
@@ -256,6 +901,60 @@ class MainWindow(QMainWindow):
 
 
 
+    """
+    Adds the results of a finished benchmark to the exported result records. A Run All report is recorded as the
+    individual runs it is made of.
+
+    Args:
+        widget (QWidget): The widget that ran the benchmark.
+        benchmark_results (dict): The results of the benchmark, or the combined report of a schedule.
+        total_score (float): The total score of the benchmark.
+        total_wattage (float): The total wattage of the benchmark.
+    """
+    def record_results(self, widget, benchmark_results, total_score, total_wattage):
+        if isinstance(widget, RunAllWidget):
+            for run in benchmark_results["runs"]:
+                if "error" in run:
+                    continue
+                self.result_records.extend(
+                    to_records(SUITES[run["suite"]][0], run["results"], run["total_score"], run["total_wattage"])
+                )
+        else:
+            self.result_records.extend(to_records(widget.label_text, benchmark_results, total_score, total_wattage))
+
+        if TEXTFILE_COLLECTOR_PATH:
+            write_textfile(self.result_records, TEXTFILE_COLLECTOR_PATH)
+
+
+    """
+    Writes every result recorded so far to RESULTS_DIRECTORY in the OpenMetrics, CSV and JSON Lines formats.
+    """
+    def export_results(self):
+        os.makedirs(RESULTS_DIRECTORY, exist_ok=True)
+        write_textfile(self.result_records, os.path.join(RESULTS_DIRECTORY, "benchmark.prom"))
+        write_csv(self.result_records, os.path.join(RESULTS_DIRECTORY, "benchmark.csv"))
+        write_jsonl(self.result_records, os.path.join(RESULTS_DIRECTORY, "benchmark.jsonl"))
+        self.export_label.setText("Exported {} records to {}/".format(len(self.result_records), RESULTS_DIRECTORY))
+
+
+    """
+    Starts or stops the local /metrics endpoint.
+
+    Args:
+        checked (bool): Whether the endpoint should be running.
+    """
+    def toggle_metrics_server(self, checked):
+        if checked and self.metrics_server is None:
+            try:
+                self.metrics_server = serve_metrics(lambda: list(self.result_records), port=METRICS_PORT)
+            except OSError as error:
+                self.export_label.setText("Could not serve metrics: {}".format(error))
+        elif not checked and self.metrics_server is not None:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
+            self.metrics_server = None
+
+
     """
     Overrides the default close event for the main window.
 
@@ -270,9 +969,10 @@ class MainWindow(QMainWindow):
     """
     def closeEvent(self, event):
         # Stop any running benchmarks
-        for widget in self.central_widget.findChildren(BenchmarkWidget):
-            if widget.benchmark_worker and widget.benchmark_worker.isRunning():
-                widget.benchmark_worker.stop()
+        for widget_type in (BenchmarkWidget, RunAllWidget):
+            for widget in self.central_widget.findChildren(widget_type):
+                if widget.benchmark_worker and widget.benchmark_worker.isRunning():
+                    widget.benchmark_worker.stop()
         event.accept()
 
 
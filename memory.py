@@ -0,0 +1,223 @@
+import ctypes
+import os
+import resource
+import sys
+import threading
+import time
+
+import psutil
+
+
+# Seconds between memory samples, short so that the peak of a brief allocation is not missed
+MEMORY_INTERVAL = 0.1
+# Seconds between the parts of a sample that walk all of /proc or every memory mapping: listing the child processes,
+# and the USS on platforms without a cheap RssAnon (macOS)
+SLOW_SAMPLE_INTERVAL = 1.0
+
+
+class MemoryCeilingExceeded(RuntimeError):
+    pass
+
+
+class MemoryMonitor(threading.Thread):
+    """
+    Samples the memory of the benchmark process (and its children) on a background thread and keeps the peaks: the RSS
+    and the anonymous memory of the whole process tree, and the number of blocks allocated by Python.
+
+    The anonymous memory (RssAnon on Linux, the unique set size elsewhere) is the heap in the wide sense: every Python
+    object plus native buffers such as numpy arrays and TensorFlow tensors, without the mapped code and libraries that
+    make up the rest of the RSS. The sampler runs in the measured process, so it is kept cheap: the child processes are
+    only listed again every SLOW_SAMPLE_INTERVAL, as is the USS where it means walking every mapping, and the time
+    spent sampling is tracked so it can be reported next to the results.
+
+    If a ceiling is set and the RSS goes above it, the monitor raises MemoryCeilingExceeded in the benchmark thread, so
+    the benchmark unwinds and frees its memory (and terminates any pool it started) before it can threaten the host.
+    The exception is only raised between two Python bytecodes, so a single allocation in C still runs to completion.
+
+    Args:
+        ceiling_bytes (int): The largest RSS allowed, or None for no ceiling.
+        thread_id (int): The thread running the benchmark, the one the exception is raised in.
+        interval (float): Seconds between samples.
+    """
+
+    def __init__(self, ceiling_bytes=None, thread_id=None, interval=MEMORY_INTERVAL):
+        super().__init__(daemon=True)
+        self.ceiling_bytes = ceiling_bytes
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.process = psutil.Process(os.getpid())
+        self.children = []
+        self.anon = {}
+        self.last_slow_sample = None
+        self.sampling_time = 0.0
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        self.start_rss, self.start_anon = self._process_memory()
+        self.peak_rss = self.start_rss
+        self.peak_anon = self.start_anon
+        self.peak_blocks = sys.getallocatedblocks()
+        self.exceeded = False
+        self._lock = threading.Lock()
+        self._running = True
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            sample_start = time.perf_counter()
+            self.take_sample()
+            self.sampling_time += time.perf_counter() - sample_start
+            if self.ceiling_bytes and self.peak_rss > self.ceiling_bytes and not self.exceeded:
+                self.abort()
+        self.take_sample()
+        self.end_time = time.perf_counter()
+
+    """
+    Stops sampling. Once this returns the monitor will not raise MemoryCeilingExceeded anymore, but one it raised just
+    before can still arrive in the benchmark thread while it is in here, in which case stopping is simply retried.
+    """
+    def stop(self):
+        while True:
+            try:
+                with self._lock:
+                    self._running = False
+                self._stop_event.set()
+                self.join()
+                return
+            except MemoryCeilingExceeded:
+                continue
+
+    def take_sample(self):
+        rss, anon = self._process_memory()
+        self.peak_rss = max(self.peak_rss, rss)
+        self.peak_anon = max(self.peak_anon, anon)
+        self.peak_blocks = max(self.peak_blocks, sys.getallocatedblocks())
+
+    """
+    Returns the share of the run spent taking samples, in percent.
+    """
+    def overhead_percent(self):
+        elapsed = (self.end_time or time.perf_counter()) - self.start_time
+        return round(100 * self.sampling_time / elapsed, 3) if elapsed > 0 else 0.0
+
+    """
+    Stops the benchmark because it went above the ceiling.
+    """
+    def abort(self):
+        with self._lock:
+            if not self._running:
+                return
+            self.exceeded = True
+            ctypes.pythonapi.PyThreadState_SetAsyncExc(
+                ctypes.c_ulong(self.thread_id), ctypes.py_object(MemoryCeilingExceeded)
+            )
+
+    def _process_memory(self):
+        now = time.perf_counter()
+        slow = self.last_slow_sample is None or now - self.last_slow_sample >= SLOW_SAMPLE_INTERVAL
+        if slow:
+            self.last_slow_sample = now
+            try:
+                self.children = self.process.children(recursive=True)
+            except psutil.NoSuchProcess:
+                self.children = []
+
+        rss = anon = 0
+        for process in [self.process] + self.children:
+            try:
+                process_rss, process_anon = _read_proc_status(process.pid)
+                if process_rss is None:
+                    process_rss = process.memory_info().rss
+                if process_anon is None:
+                    # Without RssAnon the USS is the only figure, and it is too slow to take at every sample
+                    if slow or process.pid not in self.anon:
+                        self.anon[process.pid] = process.memory_full_info().uss
+                    process_anon = self.anon[process.pid]
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            rss += process_rss
+            anon += process_anon
+        return rss, anon
+
+
+def _read_proc_status(pid):
+    # One read of /proc/<pid>/status gives both figures on Linux, both are None where there is no /proc
+    rss = anon = None
+    try:
+        with open("/proc/{}/status".format(pid)) as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) * 1024
+                elif line.startswith("RssAnon:"):
+                    anon = int(line.split()[1]) * 1024
+    except FileNotFoundError:
+        if os.path.isdir("/proc"):
+            raise psutil.NoSuchProcess(pid)
+    except OSError:
+        pass
+    return rss, anon
+
+
+def _rusage():
+    return resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+
+
+def _max_rss_bytes(usage):
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+"""
+Runs a benchmark with a MemoryMonitor attached and adds its memory footprint to the results under "memory": the peak
+RSS and anonymous memory sampled over the process tree (see MemoryMonitor for what the latter covers), the peak
+number of Python blocks, and from getrusage the page faults taken during the run and the lifetime peak RSS of this
+process and of its largest child. The exact peak of the traced Python heap is added when the profiler traced
+allocations, and the sampling overhead in percent of the run. Run it in the process that runs the benchmark, inside
+an isolated child for isolated runs.
+
+Args:
+    benchmark_fn (function): The benchmark entry point, e.g. perform_ram_benchmark.
+    progress_callback: The object passed through to the benchmark to report progress.
+    ceiling_mb (float): Abort the benchmark with MemoryCeilingExceeded once its RSS goes above this many megabytes.
+
+Returns:
+    tuple: The benchmark results, total score and total wattage.
+"""
+def run_with_memory_monitor(benchmark_fn, progress_callback, ceiling_mb=None):
+    ceiling_bytes = int(ceiling_mb * 1024 * 1024) if ceiling_mb else None
+    self_before, children_before = _rusage()
+
+    monitor = MemoryMonitor(ceiling_bytes)
+    monitor.start()
+    try:
+        benchmark_results, total_score, total_wattage = benchmark_fn(progress_callback)
+    except MemoryCeilingExceeded:
+        # Raised by the monitor without any details, raised again below with them
+        if not monitor.exceeded:
+            raise
+    finally:
+        monitor.stop()
+
+    if monitor.exceeded:
+        raise MemoryCeilingExceeded("The benchmark used {:.0f} MB, above the {:.0f} MB ceiling".format(
+            monitor.peak_rss / 1024 ** 2, ceiling_mb
+        ))
+
+    self_after, children_after = _rusage()
+    benchmark_results["memory"] = {
+        "start_rss_bytes": monitor.start_rss,
+        "peak_rss_bytes": monitor.peak_rss,
+        "start_anon_bytes": monitor.start_anon,
+        "peak_anon_bytes": monitor.peak_anon,
+        # The exact peak of Python allocations, only known when the profiler traced them for this run
+        "peak_traced_bytes": benchmark_results.get("profile", {}).get("peak_traced_bytes"),
+        "peak_python_blocks": monitor.peak_blocks,
+        "max_rss_bytes": _max_rss_bytes(self_after),
+        "children_max_rss_bytes": _max_rss_bytes(children_after),
+        "minor_page_faults": (self_after.ru_minflt - self_before.ru_minflt)
+            + (children_after.ru_minflt - children_before.ru_minflt),
+        "major_page_faults": (self_after.ru_majflt - self_before.ru_majflt)
+            + (children_after.ru_majflt - children_before.ru_majflt),
+        "ceiling_bytes": ceiling_bytes,
+        "overhead_percent": monitor.overhead_percent(),
+    }
+    return benchmark_results, total_score, total_wattage
@@ -1,6 +1,7 @@
 import numpy as np
 from PyQt6.QtCore import QThread, pyqtSignal
 import concurrent.futures
+import time
 from wattage import measure_wattage
 import tensorflow as tf
 
@@ -19,6 +20,9 @@ class BenchmarkWorker(QThread):
     def emit_current_test_info(self, text):
         self.current_test_info.emit(text)
 
+    def emit_sample(self, label, value):
+        pass
+
 
 
 
@@ -74,8 +78,10 @@ def run_neural_network_inference_benchmark(benchmark_worker):
 
     scores = []
     for _ in range(1000):
+        start_time = time.perf_counter()
         prediction = model.predict(image)
         scores.append(np.max(prediction))
+        benchmark_worker.emit_sample("Inference prediction (ms)", (time.perf_counter() - start_time) * 1000)
 
     average_score = np.mean(scores)
 
@@ -108,7 +114,9 @@ def run_neural_network_training_benchmark(benchmark_worker):
     model.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
 
     for _ in range(10): 
+        start_time = time.perf_counter()
         model.fit(images, labels, epochs=1, batch_size=32, verbose=0)
+        benchmark_worker.emit_sample("Training epoch (s)", time.perf_counter() - start_time)
 
     score = model.evaluate(images, labels)[1]
 
@@ -0,0 +1,602 @@
+import asyncio
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+
+from wattage import measure_wattage
+
+
+CONCURRENCY_LEVELS = [1, 4, 16]
+# Seconds each test runs at each concurrency level
+TEST_DURATION = 1.0
+CHUNK_SIZE = 64 * 1024
+MESSAGE_SIZE = 64
+DATAGRAM_SIZE = 8 * 1024
+SENDFILE_SIZE = 16 * 1024 * 1024
+HOST = "127.0.0.1"
+
+
+"""
+Returns the given percentile of a list of values using the nearest-rank method.
+
+Args:
+    values (list): The values.
+    percentile (float): The percentile, between 0 and 100.
+
+Returns:
+    float: The percentile, or 0 if there are no values.
+"""
+def percentile(values, percentile):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _rtt_summary(rtts, duration):
+    return {
+        "requests_per_s": round(len(rtts) / duration, 3),
+        "rtt_ms": {
+            "p50": round(percentile(rtts, 50) * 1000, 4),
+            "p99": round(percentile(rtts, 99) * 1000, 4),
+        },
+    }
+
+
+def _recv_exactly(connection, size):
+    data = b""
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed")
+        data += chunk
+    return data
+
+
+class ThreadedTCPServer:
+    """
+    A minimal loopback TCP server that hands every accepted connection to handler(connection) on its own thread.
+    With handler=None connections are closed as soon as they are accepted, for measuring the connection rate.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.listener = socket.create_server((HOST, 0), backlog=1024)
+        self.listener.settimeout(0.1)
+        self.port = self.listener.getsockname()[1]
+        self.stop_event = threading.Event()
+        self.handler_threads = []
+        self.accept_thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self.accept_thread.start()
+
+    def _accept_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                connection, address = self.listener.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            if self.handler is None:
+                connection.close()
+                continue
+
+            connection.settimeout(None)
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            thread = threading.Thread(target=self._handle, args=(connection,), daemon=True)
+            thread.start()
+            self.handler_threads.append(thread)
+
+    def _handle(self, connection):
+        with connection:
+            try:
+                self.handler(connection)
+            except OSError:
+                pass
+
+    """
+    Stops accepting connections and waits for the handlers of the accepted ones to finish.
+    """
+    def close(self):
+        self.stop_event.set()
+        self.accept_thread.join()
+        self.listener.close()
+        for thread in self.handler_threads:
+            thread.join(5)
+
+
+def _run_clients(concurrency, client):
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+"""
+Measures TCP throughput with blocking sockets, one thread per connection on both sides.
+
+Args:
+    concurrency (int): The number of connections sending at the same time.
+
+Returns:
+    dict: The throughput in MB/s, measured on the receiving side.
+"""
+def tcp_throughput_threads(concurrency):
+    received = [0]
+    lock = threading.Lock()
+
+    def drain(connection):
+        total = 0
+        while True:
+            data = connection.recv(CHUNK_SIZE)
+            if not data:
+                break
+            total += len(data)
+        with lock:
+            received[0] += total
+
+    server = ThreadedTCPServer(drain)
+    payload = b"x" * CHUNK_SIZE
+
+    start_time = time.perf_counter()
+    deadline = start_time + TEST_DURATION
+
+    def client(index):
+        with socket.create_connection((HOST, server.port)) as connection:
+            while time.perf_counter() < deadline:
+                connection.sendall(payload)
+
+    _run_clients(concurrency, client)
+    server.close()
+    elapsed_time = time.perf_counter() - start_time
+
+    return {"mb_per_s": round(received[0] / elapsed_time / (1024 * 1024), 3)}
+
+
+"""
+Measures TCP throughput using socket.sendfile, which uses the zero-copy os.sendfile path where the platform has it, so
+the data goes from the page cache to the socket without passing through Python.
+
+Args:
+    concurrency (int): The number of connections sending at the same time.
+
+Returns:
+    dict: The throughput in MB/s, measured on the receiving side.
+"""
+def tcp_throughput_sendfile(concurrency):
+    received = [0]
+    lock = threading.Lock()
+
+    def drain(connection):
+        total = 0
+        while True:
+            data = connection.recv(CHUNK_SIZE)
+            if not data:
+                break
+            total += len(data)
+        with lock:
+            received[0] += total
+
+    with tempfile.NamedTemporaryFile() as source:
+        source.write(os.urandom(1024 * 1024) * (SENDFILE_SIZE // (1024 * 1024)))
+        source.flush()
+
+        server = ThreadedTCPServer(drain)
+        start_time = time.perf_counter()
+        deadline = start_time + TEST_DURATION
+
+        def client(index):
+            with socket.create_connection((HOST, server.port)) as connection, open(source.name, "rb") as f:
+                while time.perf_counter() < deadline:
+                    connection.sendfile(f, 0)
+
+        _run_clients(concurrency, client)
+        server.close()
+        elapsed_time = time.perf_counter() - start_time
+
+    return {"mb_per_s": round(received[0] / elapsed_time / (1024 * 1024), 3)}
+
+
+"""
+Measures UDP throughput with blocking sockets. Senders don't wait for the receiver, so the datagrams it could not keep
+up with are dropped and reported as loss.
+
+Args:
+    concurrency (int): The number of threads sending at the same time.
+
+Returns:
+    dict: The received throughput in MB/s and the percentage of datagrams lost.
+"""
+def udp_throughput_threads(concurrency):
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    receiver.bind((HOST, 0))
+    receiver.settimeout(0.1)
+    address = receiver.getsockname()
+
+    received = [0, 0]
+    sent = [0]
+    lock = threading.Lock()
+    stop_event = threading.Event()
+
+    def receive():
+        while not stop_event.is_set():
+            try:
+                data = receiver.recv(DATAGRAM_SIZE)
+            except socket.timeout:
+                continue
+            received[0] += len(data)
+            received[1] += 1
+
+    receive_thread = threading.Thread(target=receive, daemon=True)
+    receive_thread.start()
+
+    payload = b"x" * DATAGRAM_SIZE
+    start_time = time.perf_counter()
+    deadline = start_time + TEST_DURATION
+
+    def client(index):
+        count = 0
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+            while time.perf_counter() < deadline:
+                try:
+                    sender.sendto(payload, address)
+                    count += 1
+                except OSError:
+                    # ENOBUFS on a full send buffer, the datagram is lost like any other
+                    pass
+        with lock:
+            sent[0] += count
+
+    _run_clients(concurrency, client)
+    elapsed_time = time.perf_counter() - start_time
+
+    # Give the receiver a moment to read what is still queued
+    time.sleep(0.1)
+    stop_event.set()
+    receive_thread.join()
+    receiver.close()
+
+    loss = 100 * (1 - received[1] / sent[0]) if sent[0] else 0.0
+    return {
+        "mb_per_s": round(received[0] / elapsed_time / (1024 * 1024), 3),
+        "loss_percent": round(max(loss, 0.0), 3),
+    }
+
+
+"""
+Measures TCP request/response round trips with blocking sockets. Each connection sends a small message and waits for
+the server to echo it back before sending the next one.
+
+Args:
+    concurrency (int): The number of connections doing round trips at the same time.
+
+Returns:
+    dict: The requests per second and the p50/p99 round trip times in milliseconds.
+"""
+def tcp_request_response_threads(concurrency):
+    def echo(connection):
+        while True:
+            data = connection.recv(MESSAGE_SIZE)
+            if not data:
+                break
+            connection.sendall(data)
+
+    server = ThreadedTCPServer(echo)
+    message = b"x" * MESSAGE_SIZE
+    rtts = []
+    lock = threading.Lock()
+
+    start_time = time.perf_counter()
+    deadline = start_time + TEST_DURATION
+
+    def client(index):
+        client_rtts = []
+        with socket.create_connection((HOST, server.port)) as connection:
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            while time.perf_counter() < deadline:
+                request_start = time.perf_counter()
+                connection.sendall(message)
+                _recv_exactly(connection, MESSAGE_SIZE)
+                client_rtts.append(time.perf_counter() - request_start)
+        with lock:
+            rtts.extend(client_rtts)
+
+    _run_clients(concurrency, client)
+    elapsed_time = time.perf_counter() - start_time
+    server.close()
+
+    return _rtt_summary(rtts, elapsed_time)
+
+
+"""
+Measures UDP request/response round trips against a single echo thread. Requests that get no answer within a second
+are counted as lost.
+
+Args:
+    concurrency (int): The number of clients doing round trips at the same time.
+
+Returns:
+    dict: The requests per second and the p50/p99 round trip times in milliseconds.
+"""
+def udp_request_response_threads(concurrency):
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind((HOST, 0))
+    server.settimeout(0.1)
+    address = server.getsockname()
+    stop_event = threading.Event()
+
+    def echo():
+        while not stop_event.is_set():
+            try:
+                data, client_address = server.recvfrom(MESSAGE_SIZE)
+            except socket.timeout:
+                continue
+            server.sendto(data, client_address)
+
+    echo_thread = threading.Thread(target=echo, daemon=True)
+    echo_thread.start()
+
+    message = b"x" * MESSAGE_SIZE
+    rtts = []
+    lock = threading.Lock()
+
+    start_time = time.perf_counter()
+    deadline = start_time + TEST_DURATION
+
+    def client(index):
+        client_rtts = []
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as connection:
+            connection.settimeout(1.0)
+            while time.perf_counter() < deadline:
+                request_start = time.perf_counter()
+                connection.sendto(message, address)
+                try:
+                    connection.recv(MESSAGE_SIZE)
+                except socket.timeout:
+                    continue
+                client_rtts.append(time.perf_counter() - request_start)
+        with lock:
+            rtts.extend(client_rtts)
+
+    _run_clients(concurrency, client)
+    elapsed_time = time.perf_counter() - start_time
+    stop_event.set()
+    echo_thread.join()
+    server.close()
+
+    return _rtt_summary(rtts, elapsed_time)
+
+
+"""
+Measures how many TCP connections per second can be opened and closed. Clients close with SO_LINGER 0 so the loopback
+ports don't pile up in TIME_WAIT.
+
+Args:
+    concurrency (int): The number of threads opening connections at the same time.
+
+Returns:
+    dict: The connections per second.
+"""
+def tcp_connect_threads(concurrency):
+    server = ThreadedTCPServer(None)
+    connections = [0]
+    lock = threading.Lock()
+    linger = struct.pack("ii", 1, 0)
+
+    start_time = time.perf_counter()
+    deadline = start_time + TEST_DURATION
+
+    def client(index):
+        count = 0
+        while time.perf_counter() < deadline:
+            try:
+                connection = socket.create_connection((HOST, server.port))
+            except OSError:
+                continue
+            connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, linger)
+            connection.close()
+            count += 1
+        with lock:
+            connections[0] += count
+
+    _run_clients(concurrency, client)
+    elapsed_time = time.perf_counter() - start_time
+    server.close()
+
+    return {"connections_per_s": round(connections[0] / elapsed_time, 3)}
+
+
+async def _asyncio_throughput(concurrency):
+    received = [0]
+    finished = asyncio.Queue()
+
+    async def drain(reader, writer):
+        while True:
+            data = await reader.read(CHUNK_SIZE)
+            if not data:
+                break
+            received[0] += len(data)
+        writer.close()
+        finished.put_nowait(True)
+
+    server = await asyncio.start_server(drain, HOST, 0)
+    port = server.sockets[0].getsockname()[1]
+    payload = b"x" * CHUNK_SIZE
+
+    start_time = time.perf_counter()
+    deadline = start_time + TEST_DURATION
+
+    async def client():
+        reader, writer = await asyncio.open_connection(HOST, port)
+        while time.perf_counter() < deadline:
+            writer.write(payload)
+            await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    # Wait for the server to read whatever was still in flight
+    for _ in range(concurrency):
+        await asyncio.wait_for(finished.get(), 5)
+    elapsed_time = time.perf_counter() - start_time
+
+    server.close()
+    await server.wait_closed()
+    return {"mb_per_s": round(received[0] / elapsed_time / (1024 * 1024), 3)}
+
+
+async def _asyncio_request_response(concurrency):
+    async def echo(reader, writer):
+        try:
+            while True:
+                data = await reader.readexactly(MESSAGE_SIZE)
+                writer.write(data)
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass
+        writer.close()
+
+    server = await asyncio.start_server(echo, HOST, 0)
+    port = server.sockets[0].getsockname()[1]
+    message = b"x" * MESSAGE_SIZE
+    rtts = []
+
+    start_time = time.perf_counter()
+    deadline = start_time + TEST_DURATION
+
+    async def client():
+        reader, writer = await asyncio.open_connection(HOST, port)
+        writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while time.perf_counter() < deadline:
+            request_start = time.perf_counter()
+            writer.write(message)
+            await writer.drain()
+            await reader.readexactly(MESSAGE_SIZE)
+            rtts.append(time.perf_counter() - request_start)
+        writer.close()
+        await writer.wait_closed()
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed_time = time.perf_counter() - start_time
+
+    server.close()
+    await server.wait_closed()
+    return _rtt_summary(rtts, elapsed_time)
+
+
+async def _asyncio_connect(concurrency):
+    async def close(reader, writer):
+        writer.close()
+
+    server = await asyncio.start_server(close, HOST, 0, backlog=1024)
+    port = server.sockets[0].getsockname()[1]
+    linger = struct.pack("ii", 1, 0)
+    connections = [0]
+
+    start_time = time.perf_counter()
+    deadline = start_time + TEST_DURATION
+
+    async def client():
+        while time.perf_counter() < deadline:
+            try:
+                reader, writer = await asyncio.open_connection(HOST, port)
+            except OSError:
+                continue
+            writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, linger)
+            writer.close()
+            connections[0] += 1
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed_time = time.perf_counter() - start_time
+
+    server.close()
+    await server.wait_closed()
+    return {"connections_per_s": round(connections[0] / elapsed_time, 3)}
+
+
+"""
+Measures TCP throughput with asyncio streams, every connection and the server running on a single event loop.
+"""
+def tcp_throughput_asyncio(concurrency):
+    return asyncio.run(_asyncio_throughput(concurrency))
+
+
+"""
+Measures TCP request/response round trips with asyncio streams.
+"""
+def tcp_request_response_asyncio(concurrency):
+    return asyncio.run(_asyncio_request_response(concurrency))
+
+
+"""
+Measures the TCP connection rate with asyncio streams.
+"""
+def tcp_connect_asyncio(concurrency):
+    return asyncio.run(_asyncio_connect(concurrency))
+
+
+NETWORK_TESTS = {
+    "tcp_throughput_threads": tcp_throughput_threads,
+    "tcp_throughput_asyncio": tcp_throughput_asyncio,
+    "tcp_throughput_sendfile": tcp_throughput_sendfile,
+    "udp_throughput_threads": udp_throughput_threads,
+    "tcp_request_response_threads": tcp_request_response_threads,
+    "tcp_request_response_asyncio": tcp_request_response_asyncio,
+    "udp_request_response_threads": udp_request_response_threads,
+    "tcp_connect_threads": tcp_connect_threads,
+    "tcp_connect_asyncio": tcp_connect_asyncio,
+}
+
+
+"""
+Runs the loopback network benchmark: TCP and UDP throughput, request/response round trips and connection rate, each
+with blocking sockets and threads, with asyncio, and (for TCP throughput) with the zero-copy sendfile path, at every
+level in CONCURRENCY_LEVELS. Everything runs over loopback, so it measures the network stack and the Python overhead
+around it, not the network card.
+
+Args:
+    progress_callback: An object that allows the function to update the progress of the test.
+
+Returns:
+    tuple: The benchmark results (keyed by test and concurrency level, e.g. results["tcp_throughput_threads"]["c4"]),
+    the total score (the sum of every throughput in MB/s) and the total wattage.
+"""
+def perform_network_benchmark(progress_callback):
+    benchmark_results = {}
+    total_steps = len(NETWORK_TESTS) * len(CONCURRENCY_LEVELS)
+    step = 0
+
+    for test_name, test_fn in NETWORK_TESTS.items():
+        benchmark_results[test_name] = {}
+
+        for concurrency in CONCURRENCY_LEVELS:
+            progress_callback.emit_current_test_info("Running {} ({} connections)".format(test_name, concurrency))
+            result = test_fn(concurrency)
+            benchmark_results[test_name]["c{}".format(concurrency)] = result
+
+            if "mb_per_s" in result:
+                progress_callback.emit_sample("{} (MB/s)".format(test_name), result["mb_per_s"])
+            elif "rtt_ms" in result:
+                progress_callback.emit_sample("{} p99 (ms)".format(test_name), result["rtt_ms"]["p99"])
+
+            step += 1
+            progress_callback.update_progress(int(step / total_steps * 100))
+
+    print("Network Benchmark completed.")
+
+    total_score = sum(
+        result["mb_per_s"]
+        for levels in benchmark_results.values()
+        for result in levels.values()
+        if "mb_per_s" in result
+    )
+    total_wattage = measure_wattage()
+
+    return benchmark_results, round(total_score, 3), total_wattage
@@ -0,0 +1,256 @@
+import cProfile
+import collections
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+
+PROFILE_MODES = ["cprofile", "sampling"]
+PROFILE_DIRECTORY = "profiles"
+# Seconds between stack samples in sampling mode
+SAMPLE_INTERVAL = 0.005
+# The calibration workload is repeated for at least this long, so the stack sampler fires many times while it is timed
+CALIBRATION_DURATION = 20 * SAMPLE_INTERVAL
+TOP_ALLOCATIONS = 25
+
+
+class StackSampler(threading.Thread):
+    """
+    A low overhead sampling profiler. At every interval it records the stack of every other thread in the process (so,
+    unlike cProfile, it also sees the thread pools used by the GPU and Neural Engine benchmarks) and counts how often
+    each stack was seen.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own_thread = threading.get_ident()
+        thread_names = {}
+
+        while not self._stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                if thread_id not in thread_names:
+                    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append("{}:{}".format(os.path.basename(code.co_filename), code.co_name))
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Profiler:
+    """
+    Wraps the chosen profiler and, if allocations are traced, tracemalloc behind a start/stop interface. Either can be
+    left out with mode=None or trace_allocations=False, which is how measure_overhead times them separately.
+
+    Args:
+        mode (str): The profile mode, one of PROFILE_MODES, or None for no profiler.
+        trace_allocations (bool): Whether to trace allocations with tracemalloc.
+    """
+
+    def __init__(self, mode, trace_allocations=False):
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError("Unknown profile mode: {}".format(mode))
+        self.mode = mode
+        self.trace_allocations = trace_allocations
+        self.profile = None
+        self.sampler = None
+
+    def start(self):
+        if self.trace_allocations:
+            tracemalloc.start()
+        if self.mode == "cprofile":
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        elif self.mode == "sampling":
+            self.sampler = StackSampler()
+            self.sampler.start()
+
+    """
+    Stops profiling.
+
+    Returns:
+        tuple: The tracemalloc snapshot and the peak traced memory in bytes, both None if allocations weren't traced.
+    """
+    def stop(self):
+        if self.mode == "cprofile":
+            self.profile.disable()
+        elif self.mode == "sampling":
+            self.sampler.stop()
+        if not self.trace_allocations:
+            return None, None
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return snapshot, peak
+
+    """
+    Returns the profile as collapsed stacks ("frame;frame;frame count" lines), the input format of flamegraph.pl and
+    speedscope. cProfile only records caller/callee pairs, not whole stacks, so in that mode every line is a two frame
+    caller;callee stack weighted by the callee's own time in microseconds.
+    """
+    def collapsed_stacks(self):
+        if self.mode == "sampling":
+            return ["{} {}".format(stack, count) for stack, count in self.sampler.stacks.most_common()]
+
+        lines = []
+        stats = pstats.Stats(self.profile)
+        for function, (calls, primitive_calls, own_time, cumulative_time, callers) in stats.stats.items():
+            callee = _format_function(function)
+            if not callers:
+                lines.append("{} {}".format(callee, int(own_time * 1e6)))
+            for caller, caller_stats in callers.items():
+                # caller_stats is (calls, primitive calls, own time, cumulative time) for calls from this caller
+                weight = int(caller_stats[2] * 1e6)
+                if weight:
+                    lines.append("{};{} {}".format(_format_function(caller), callee, weight))
+        return lines
+
+
+def _format_function(function):
+    filename, line, name = function
+    return "{}:{}".format(os.path.basename(filename), name)
+
+
+def _fibonacci(n):
+    if n <= 1:
+        return n
+    return _fibonacci(n - 1) + _fibonacci(n - 2)
+
+
+def _calibration_workload():
+    # Calls for the profiler and allocations for tracemalloc, the two things they slow down
+    _fibonacci(20)
+    [{"index": index} for index in range(20000)]
+
+
+"""
+Measures how much the profiler and tracemalloc slow down Python code by timing a fixed workload of function calls
+and allocations with and without them. The workload is repeated for CALIBRATION_DURATION, long enough for the stack
+sampler to take many samples, and each part is timed on its own as well as together.
+
+Args:
+    mode (str): The profile mode, one of PROFILE_MODES.
+    trace_allocations (bool): Whether allocations will be traced too.
+
+Returns:
+    dict: The slowdown in percent of the profiler, of tracing allocations (None if they aren't traced) and of both.
+"""
+def measure_overhead(mode, trace_allocations=False):
+    start_time = time.perf_counter()
+    _calibration_workload()
+    repeats = max(int(CALIBRATION_DURATION / (time.perf_counter() - start_time)), 1)
+
+    def best_time(profiler=None):
+        if profiler is not None:
+            profiler.start()
+        try:
+            best = float("inf")
+            for _ in range(3):
+                start_time = time.perf_counter()
+                for _ in range(repeats):
+                    _calibration_workload()
+                best = min(best, time.perf_counter() - start_time)
+        finally:
+            if profiler is not None:
+                profiler.stop()
+        return best
+
+    def slowdown(profiled):
+        return round(max(profiled / baseline - 1, 0.0) * 100, 3)
+
+    baseline = best_time()
+    overhead = {"profiler": slowdown(best_time(Profiler(mode))), "allocations": None}
+    overhead["total"] = overhead["profiler"]
+    if trace_allocations:
+        overhead["allocations"] = slowdown(best_time(Profiler(None, trace_allocations=True)))
+        overhead["total"] = slowdown(best_time(Profiler(mode, trace_allocations=True)))
+    return overhead
+
+
+"""
+Runs a benchmark under the profiler and optionally tracemalloc, and saves next to each other in output_dir:
+
+- <name>.collapsed: collapsed stacks, to render as a flame graph
+- <name>.pstats: the raw cProfile stats (cprofile mode only)
+- <name>.alloc.txt: the top allocation sites still alive at the end of the run, and the peak traced memory (only when
+  allocations are traced)
+
+The overhead of the profiler and of tracing allocations is measured and the results are marked as not comparable with
+unprofiled runs under "profile". Only the process running the benchmark is profiled, not the processes of a
+multiprocessing pool.
+
+Args:
+    benchmark_fn (function): The benchmark entry point to profile.
+    progress_callback: The object passed through to the benchmark to report progress.
+    mode (str): "cprofile" for deterministic profiling or "sampling" for the low overhead stack sampler.
+    output_dir (str): The directory to save the profiles in.
+    top_n (int): The number of allocation sites to save.
+    trace_allocations (bool): Whether to also trace allocations with tracemalloc, which slows Python code down many
+        times over.
+
+Returns:
+    tuple: The benchmark results, total score and total wattage.
+"""
+def run_profiled(benchmark_fn, progress_callback, mode="sampling", output_dir=PROFILE_DIRECTORY, top_n=TOP_ALLOCATIONS,
+                 trace_allocations=False):
+    os.makedirs(output_dir, exist_ok=True)
+    name = "{}-{}".format(benchmark_fn.__name__, time.strftime("%Y%m%d-%H%M%S"))
+    path = os.path.join(output_dir, name)
+
+    overhead = measure_overhead(mode, trace_allocations)
+
+    profiler = Profiler(mode, trace_allocations)
+    start_time = time.perf_counter()
+    profiler.start()
+    try:
+        benchmark_results, total_score, total_wattage = benchmark_fn(progress_callback)
+    finally:
+        snapshot, peak = profiler.stop()
+    duration = time.perf_counter() - start_time
+
+    files = {"collapsed": path + ".collapsed"}
+    with open(files["collapsed"], "w") as f:
+        f.write("\n".join(profiler.collapsed_stacks()) + "\n")
+
+    if mode == "cprofile":
+        files["pstats"] = path + ".pstats"
+        profiler.profile.dump_stats(files["pstats"])
+
+    if trace_allocations:
+        files["allocations"] = path + ".alloc.txt"
+        with open(files["allocations"], "w") as f:
+            f.write("Peak traced memory: {:.1f} KiB\n".format(peak / 1024))
+            f.write("Top {} allocation sites still alive at the end of the run:\n".format(top_n))
+            for statistic in snapshot.statistics("lineno")[:top_n]:
+                f.write("{}\n".format(statistic))
+
+    print("Profile saved to", path + ".*")
+
+    benchmark_results["profile"] = {
+        "mode": mode,
+        "duration_s": round(duration, 3),
+        "overhead_percent": overhead["total"],
+        "profiler_overhead_percent": overhead["profiler"],
+        "allocation_overhead_percent": overhead["allocations"],
+        "peak_traced_bytes": peak,
+        "comparable": False,
+        "files": files,
+    }
+    return benchmark_results, total_score, total_wattage
@@ -24,6 +24,7 @@ def perform_ram_benchmark(progress_callback):
     iteration_size = memory_size // num_iterations
 
     for i in range(num_iterations):
+        start_time = time.time()
         memory_list.extend([0] * (iteration_size * 1024 * 1024))  # Allocate memory in MB, adjust this based on your system, will update this to autogenerate based on systems memory
 
         progress = int(((i + 1) / num_iterations) * 100)
@@ -34,6 +35,8 @@ def perform_ram_benchmark(progress_callback):
         for j in range(len(memory_list)):
             memory_list[j] += 1
 
+        progress_callback.emit_sample("Allocate + touch {} MB (s)".format(iteration_size), time.time() - start_time - 0.05)
+
     total_memory_used = len(memory_list)
     score = total_memory_used / (memory_size * 1024) #Need to look into how to improve this as at the moment it is not a good way to generate scores
 
@@ -0,0 +1,245 @@
+import functools
+import importlib
+import random
+import statistics
+import threading
+import time
+
+import psutil
+
+from telemetry import read_temperatures, run_with_telemetry, TELEMETRY_INTERVAL
+from isolation import BenchmarkCancelled, IsolatedRun, error_summary
+from profiling import run_profiled, PROFILE_DIRECTORY
+from memory import run_with_memory_monitor
+
+
+# name: (label, module, entry point). The modules are only imported when a suite is run, as some pull in TensorFlow.
+SUITES = {
+    "cpu": ("CPU Benchmark", "cpuBenchmark", "perform_cpu_benchmark"),
+    "gpu": ("GPU Benchmark", "gpuBenchmark", "perform_gpu_benchmark"),
+    "ram": ("RAM Benchmark", "ramBenchmark", "perform_ram_benchmark"),
+    "ssd": ("SSD Benchmark", "ssdBenchmark", "perform_ssd_benchmark"),
+    "neural_engine": ("Neural Engine Benchmark", "neBenchmark", "perform_neural_engine_benchmark"),
+    "network": ("Network Benchmark", "netBenchmark", "perform_network_benchmark"),
+    "interpreter": ("Interpreter Benchmark", "interpreterBenchmark", "perform_interpreter_benchmark"),
+    "stress": ("Stress Test", "stressBenchmark", "perform_stress_benchmark"),
+}
+
+# Held for as long as any benchmark is running so that two runs can never distort each other
+RUN_LOCK = threading.Lock()
+
+# The system counts as idle once the CPU load and the hottest sensor are below these
+IDLE_CPU_PERCENT = 15.0
+IDLE_TEMPERATURE = 65.0
+
+
+"""
+Imports and returns the entry point of a suite.
+
+Args:
+    name (str): The suite name, a key of SUITES.
+
+Returns:
+    function: The suite's perform_*_benchmark function.
+"""
+def load_suite(name):
+    label, module_name, function_name = SUITES[name]
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+class LazySuite:
+    """
+    The entry point of a suite that is only imported when it is called. Spawned children re-import the GUI script, so
+    anything it imports at the top (e.g. TensorFlow for the GPU suite) would be loaded into every isolated run. It is
+    sent to the child by the suite name and keeps the entry point's __name__, which the profiler names its files by.
+
+    Args:
+        name (str): The suite name, a key of SUITES.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.__name__ = SUITES[name][2]
+
+    def __call__(self, progress_callback, **kwargs):
+        return load_suite(self.name)(progress_callback, **kwargs)
+
+
+"""
+Runs a single suite with the extras from the run options applied: profiling ("profile", "profile_dir",
+"profile_allocations"), running it in its own pinned child process ("isolate", "cores", "niceness") and telemetry
+sampling ("telemetry", "telemetry_interval"). The memory footprint is always measured, and "memory_ceiling_mb" sets
+the RSS at which the suite is aborted with MemoryCeilingExceeded.
+
+Args:
+    benchmark_fn (function): The benchmark entry point to run.
+    progress_callback: The object progress and the current test info are reported to.
+    options (dict): The run options.
+    on_isolated_run (function): Called with the IsolatedRun before it starts, so the caller can cancel it.
+
+Returns:
+    tuple: The benchmark results, total score and total wattage.
+"""
+def run_suite(benchmark_fn, progress_callback, options, on_isolated_run=None):
+    # Wrapped before isolation so that the profiler runs in the same process as the benchmark
+    if options.get("profile"):
+        benchmark_fn = functools.partial(
+            run_profiled,
+            benchmark_fn,
+            mode=options["profile"],
+            output_dir=options.get("profile_dir", PROFILE_DIRECTORY),
+            trace_allocations=options.get("profile_allocations", False),
+        )
+
+    # Also wrapped before isolation, the footprint and the ceiling are those of the process running the benchmark
+    benchmark_fn = functools.partial(
+        run_with_memory_monitor, benchmark_fn, ceiling_mb=options.get("memory_ceiling_mb")
+    )
+
+    if options.get("isolate"):
+        isolated_run = IsolatedRun(benchmark_fn, options.get("cores"), options.get("niceness"))
+        if on_isolated_run is not None:
+            on_isolated_run(isolated_run)
+        runner = isolated_run.run
+    else:
+        runner = benchmark_fn
+
+    # The sampler follows child processes as well, so it also covers isolated runs
+    if options.get("telemetry"):
+        return run_with_telemetry(runner, progress_callback, options.get("telemetry_interval", TELEMETRY_INTERVAL))
+    return runner(progress_callback)
+
+
+"""
+Waits for the cooldown period and then, if requested, until the system is idle: the CPU load is below max_cpu_percent
+and every temperature sensor is below max_temperature. Gives up after timeout seconds so that a busy host cannot stall
+the schedule forever.
+
+Args:
+    cooldown (float): Seconds to wait unconditionally.
+    wait_idle (bool): Whether to also wait for the system to go idle.
+    timeout (float): The longest time to wait for idle, in seconds.
+    is_cancelled (function): Returns True when the schedule has been cancelled.
+
+Returns:
+    dict: The seconds waited and whether the system was idle when the wait ended.
+"""
+def wait_for_idle(cooldown, wait_idle=True, max_cpu_percent=IDLE_CPU_PERCENT, max_temperature=IDLE_TEMPERATURE,
+                  timeout=120, is_cancelled=lambda: False):
+    start_time = time.time()
+
+    while time.time() - start_time < cooldown and not is_cancelled():
+        time.sleep(0.2)
+
+    idle = not wait_idle
+    while wait_idle and not is_cancelled() and time.time() - start_time < cooldown + timeout:
+        cpu_percent = psutil.cpu_percent(interval=1)
+        temperatures = read_temperatures().values()
+        if cpu_percent < max_cpu_percent and max(temperatures, default=0) < max_temperature:
+            idle = True
+            break
+
+    return {"waited": round(time.time() - start_time, 3), "idle": idle}
+
+
+"""
+Runs a list of suites one after the other for a number of passes and combines everything into a single report.
+Suites never overlap, and between two suites the scheduler waits for a cooldown and for the system to go idle. The
+order of the suites is shuffled in every pass to cancel out ordering effects (e.g. the second suite always running on
+a hot chip). A suite that fails is recorded with its "error" in place of its results and left out of the summary,
+and the schedule carries on with the next one.
+
+Args:
+    suite_names (list): The suites to run, keys of SUITES.
+    progress_callback: The object progress and the current test info are reported to.
+    run_fn (function): Called as run_fn(benchmark_fn) to run each suite, defaults to calling the suite directly with
+        progress_callback.
+    passes (int): How many times to run the whole list.
+    shuffle (bool): Whether to shuffle the order in each pass.
+    cooldown (float): Seconds to wait between suites.
+    wait_idle (bool): Whether to also wait for the system to go idle between suites.
+    seed (int): Seed for the shuffle, so a schedule can be repeated.
+    is_cancelled (function): Returns True when the schedule should stop, it then raises BenchmarkCancelled.
+
+Returns:
+    tuple: The combined report, the total score (the sum of each suite's mean score) and the total wattage.
+"""
+def run_schedule(suite_names, progress_callback, run_fn=None, passes=1, shuffle=True, cooldown=10, wait_idle=True,
+                 seed=None, is_cancelled=lambda: False):
+    if run_fn is None:
+        run_fn = lambda benchmark_fn: benchmark_fn(progress_callback)
+
+    rng = random.Random(seed)
+    runs = []
+    orders = []
+    total_runs = passes * len(suite_names)
+
+    for pass_number in range(1, passes + 1):
+        order = list(suite_names)
+        if shuffle:
+            rng.shuffle(order)
+        orders.append(order)
+
+        for name in order:
+            wait = {"waited": 0.0, "idle": None}
+            if runs:
+                progress_callback.emit_current_test_info("Cooling down before {}".format(SUITES[name][0]))
+                wait = wait_for_idle(cooldown, wait_idle, is_cancelled=is_cancelled)
+
+            # Checked after the cooldown too, which is where a cancel usually lands
+            if is_cancelled():
+                raise BenchmarkCancelled()
+
+            progress_callback.emit_current_test_info(
+                "Pass {}/{}: {} ({}/{})".format(pass_number, passes, SUITES[name][0], len(runs) + 1, total_runs)
+            )
+            progress_callback.update_progress(0)
+
+            run = {"pass": pass_number, "suite": name, "cooldown": wait}
+            try:
+                benchmark_results, total_score, total_wattage = run_fn(load_suite(name))
+            except BenchmarkCancelled:
+                raise
+            except Exception as error:
+                # One failing suite (e.g. TensorFlow missing for the GPU suite) shouldn't lose the rest of the schedule
+                print("Suite failed:", SUITES[name][0])
+                print(error)
+                run["error"] = error_summary(error)
+            else:
+                run.update(results=benchmark_results, total_score=total_score, total_wattage=total_wattage)
+            runs.append(run)
+
+    summary = summarise_runs(runs)
+    report = {"order": orders, "runs": runs, "summary": summary}
+
+    total_score = sum(suite["mean"] for suite in summary.values())
+    total_wattage = sum(run["total_wattage"] for run in runs if "error" not in run)
+    return report, total_score, total_wattage
+
+
+"""
+Summarises the scores of each suite across passes.
+
+Args:
+    runs (list): The runs recorded by run_schedule, failed runs are skipped.
+
+Returns:
+    dict: The scores, mean, standard deviation, min and max of each suite.
+"""
+def summarise_runs(runs):
+    scores = {}
+    for run in runs:
+        if "error" in run:
+            continue
+        scores.setdefault(run["suite"], []).append(run["total_score"])
+
+    summary = {}
+    for name, suite_scores in scores.items():
+        summary[name] = {
+            "scores": suite_scores,
+            "mean": statistics.mean(suite_scores),
+            "stdev": statistics.stdev(suite_scores) if len(suite_scores) > 1 else 0.0,
+            "min": min(suite_scores),
+            "max": max(suite_scores),
+        }
+    return summary
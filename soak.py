@@ -0,0 +1,194 @@
+import argparse
+import collections
+import json
+import math
+import os
+import time
+
+from stressBenchmark import WORKLOADS, create_test_file, remove_test_file
+from wattage import measure_wattage
+
+
+# Defaults: a 10 minute run in 10 second windows
+SOAK_DURATION = 600
+SOAK_WINDOW = 10.0
+SOAK_DIRECTORY = "soak"
+# Performance has dropped once this many consecutive windows are more than DROP_THRESHOLD below the peak
+DROP_THRESHOLD = 0.10
+DROP_WINDOWS = 3
+# The sustained rate is the mean rate over the last this many seconds of the run
+SUSTAINED_SECONDS = 60
+
+
+class SoakTracker:
+    """
+    Keeps running aggregates over the window rates of a soak run: the peak, the sustained rate over the windows of the
+    last SUSTAINED_SECONDS, a least squares fit of rate over time and the first point where performance dropped. Only a fixed amount
+    of state is kept however many windows there are, so hour long runs don't grow in memory.
+
+    Args:
+        window (float): Seconds per window.
+        drop_threshold (float): How far below the peak, as a fraction, a window has to be to count as a drop.
+        drop_windows (int): How many windows in a row have to be below the threshold.
+    """
+
+    def __init__(self, window=SOAK_WINDOW, drop_threshold=DROP_THRESHOLD, drop_windows=DROP_WINDOWS):
+        self.drop_threshold = drop_threshold
+        self.drop_windows = drop_windows
+        self.count = 0
+        self.peak = 0.0
+        self.recent = collections.deque(maxlen=max(math.ceil(SUSTAINED_SECONDS / window), 1))
+        self.sum_x = self.sum_y = self.sum_xx = self.sum_xy = 0.0
+        self.below_peak = 0
+        self.below_since = None
+        self.drop_at = None
+
+    """
+    Adds the rate of a finished window.
+
+    Args:
+        time_s (float): The middle of the window, in seconds since the run started.
+        rate (float): The rate measured in the window.
+    """
+    def add(self, time_s, rate):
+        self.count += 1
+        self.peak = max(self.peak, rate)
+        self.recent.append(rate)
+
+        self.sum_x += time_s
+        self.sum_y += rate
+        self.sum_xx += time_s * time_s
+        self.sum_xy += time_s * rate
+
+        if rate < self.peak * (1 - self.drop_threshold):
+            if self.below_peak == 0:
+                self.below_since = time_s
+            self.below_peak += 1
+            if self.drop_at is None and self.below_peak >= self.drop_windows:
+                self.drop_at = self.below_since
+        else:
+            self.below_peak = 0
+
+    def slope(self):
+        denominator = self.count * self.sum_xx - self.sum_x * self.sum_x
+        if self.count < 2 or not denominator:
+            return 0.0
+        return (self.count * self.sum_xy - self.sum_x * self.sum_y) / denominator
+
+    """
+    Summarises the run.
+
+    Returns:
+        dict: The peak and sustained rate, their ratio, the degradation slope in percent of the peak per minute
+        (negative when performance degrades) and when performance dropped, in seconds (None if it never did).
+    """
+    def report(self):
+        sustained = sum(self.recent) / len(self.recent) if self.recent else 0.0
+        return {
+            "windows": self.count,
+            "peak_per_s": round(self.peak, 3),
+            "sustained_per_s": round(sustained, 3),
+            "sustained_ratio": round(sustained / self.peak, 4) if self.peak else 0.0,
+            "slope_percent_per_min": round(self.slope() * 60 / self.peak * 100, 4) if self.peak else 0.0,
+            "drop_at_s": round(self.drop_at, 3) if self.drop_at is not None else None,
+        }
+
+
+"""
+Runs one of the stress workloads continuously for a set duration and measures its rate in fixed windows. Every window
+is appended to output_path as a JSON line as soon as it completes, so the time series is on disk even if the run is
+stopped and nothing but running aggregates is kept in memory.
+
+Args:
+    workload (str): The workload to run, a key of stressBenchmark.WORKLOADS.
+    progress_callback: The object progress, the current test info and every window's rate are reported to.
+    duration (float): Seconds to run for.
+    window (float): Seconds per window.
+    output_path (str): The JSON Lines file to stream the windows to.
+
+Returns:
+    dict: The summary from SoakTracker.report, with the workload, its unit and the output file.
+"""
+def run_soak(workload, progress_callback, duration=SOAK_DURATION, window=SOAK_WINDOW, output_path=None):
+    label, unit, workload_fn = WORKLOADS[workload]
+    if output_path is None:
+        output_path = os.path.join(SOAK_DIRECTORY, "{}-{}.jsonl".format(workload, time.strftime("%Y%m%d-%H%M%S")))
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+    progress_callback.emit_current_test_info("Running Soak Test: {} for {:.0f} s".format(label, duration))
+    tracker = SoakTracker(window)
+    path = create_test_file() if workload == "ssd" else None
+    try:
+        with open(output_path, "w") as f:
+            start_time = time.perf_counter()
+            index = 0
+            while time.perf_counter() - start_time < duration:
+                window_start = time.perf_counter()
+                window_end = min(window_start + window, start_time + duration)
+                work = workload_fn(window_end, path)
+                elapsed = time.perf_counter() - window_start
+                rate = work / elapsed
+
+                time_s = window_start - start_time + elapsed / 2
+                tracker.add(time_s, rate)
+                f.write(json.dumps({"window": index, "time_s": round(time_s, 3), "per_s": round(rate, 3)}) + "\n")
+                f.flush()
+                index += 1
+
+                progress_callback.emit_sample("{}/s".format(unit), rate)
+                progress_callback.update_progress(min(int((time.perf_counter() - start_time) / duration * 100), 100))
+    finally:
+        if path is not None:
+            remove_test_file(path)
+
+    report = tracker.report()
+    report.update(workload=workload, unit=unit, file=output_path)
+    return report
+
+
+"""
+Runs the soak test as a benchmark, for the GUI.
+
+Args:
+    progress_callback: An object that allows the function to update the progress of the test.
+    workload (str): The workload to run, a key of stressBenchmark.WORKLOADS.
+    duration (float): Seconds to run for.
+    window (float): Seconds per window.
+
+Returns:
+    tuple: The benchmark results, the total score (the sustained rate as a percentage of the peak, higher is better)
+    and the total wattage.
+"""
+def perform_soak_benchmark(progress_callback, workload="cpu", duration=SOAK_DURATION, window=SOAK_WINDOW):
+    report = run_soak(workload, progress_callback, duration, window)
+    print("Soak Test completed, windows saved to", report["file"])
+
+    total_wattage = measure_wattage()
+    return {workload: report}, round(report["sustained_ratio"] * 100, 3), total_wattage
+
+
+class _PrintProgress:
+    def update_progress(self, progress):
+        pass
+
+    def emit_current_test_info(self, test_info):
+        print(test_info)
+
+    def emit_sample(self, label, value):
+        print("{:.3f} {}".format(value, label))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a workload continuously and track how its performance holds up.")
+    parser.add_argument("--workload", choices=sorted(WORKLOADS), default="cpu")
+    parser.add_argument("--duration", type=float, default=SOAK_DURATION, help="Seconds to run for")
+    parser.add_argument("--window", type=float, default=SOAK_WINDOW, help="Seconds per window")
+    parser.add_argument("--output", help="The JSON Lines file to stream the windows to")
+    args = parser.parse_args()
+
+    report = run_soak(args.workload, _PrintProgress(), args.duration, args.window, args.output)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -33,11 +33,14 @@ def perform_ssd_benchmark(progress_callback):
 
         data = bytearray(os.urandom(size * 1024))
 
+        start_time = time.time()
         with open(file_path, "wb") as f:
             f.write(data)
 
         with open(file_path, "rb") as f:
             read_data = f.read()
+        elapsed_time = time.time() - start_time
+        progress_callback.emit_sample("Write + Read (MB/s)", (2 * size / 1024) / max(elapsed_time, 1e-9))
 
         if data == read_data:
             print(f"Random Read/Write for {size}KB File: Passed")
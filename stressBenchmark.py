@@ -0,0 +1,191 @@
+import multiprocessing
+import os
+import random
+import time
+
+from cpuBenchmark import fibonacci
+from wattage import measure_wattage
+
+
+# Seconds each phase runs for
+STRESS_DURATION = 10.0
+# Worker processes per workload, 0 leaves a workload out
+STRESS_INTENSITY = {"cpu": 1, "ram": 1, "ssd": 1}
+# Seconds to wait for every worker of a phase to start, spawned workers re-import the main script first
+STARTUP_TIMEOUT = 120.0
+RAM_BUFFER_MB = 64
+SSD_FILE_MB = 256
+SSD_BLOCK_SIZE = 4096
+# Random writes between fsyncs, without the fsync the writes would only ever reach the page cache
+SSD_SYNC_EVERY = 64
+TEST_DIRECTORY = "stress_benchmark"
+
+
+def cpu_workload(deadline, path):
+    calls = 0
+    while time.perf_counter() < deadline:
+        fibonacci(20)
+        calls += 1
+    return calls
+
+
+def ram_workload(deadline, path):
+    source = bytearray(RAM_BUFFER_MB * 1024 * 1024)
+    target = bytearray(len(source))
+    copies = 0
+    while time.perf_counter() < deadline:
+        target[:] = source
+        copies += 1
+    return copies * RAM_BUFFER_MB
+
+
+def ssd_workload(deadline, path):
+    block = os.urandom(SSD_BLOCK_SIZE)
+    blocks = os.path.getsize(path) // SSD_BLOCK_SIZE
+    fd = os.open(path, os.O_WRONLY)
+    writes = 0
+    try:
+        while time.perf_counter() < deadline:
+            os.pwrite(fd, block, random.randrange(blocks) * SSD_BLOCK_SIZE)
+            writes += 1
+            if writes % SSD_SYNC_EVERY == 0:
+                os.fsync(fd)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    return writes
+
+
+# name: (label, unit, workload). A workload runs until the deadline and returns how much work it did, in its unit.
+WORKLOADS = {
+    "cpu": ("CPU", "fibonacci(20) calls", cpu_workload),
+    "ram": ("RAM Bandwidth", "MB copied", ram_workload),
+    "ssd": ("SSD Random Writes", "4 KiB writes", ssd_workload),
+}
+
+
+"""
+Creates the file the SSD workload writes to, filled with random data.
+
+Returns:
+    str: The path of the file.
+"""
+def create_test_file():
+    os.makedirs(TEST_DIRECTORY, exist_ok=True)
+    path = os.path.join(TEST_DIRECTORY, "stress_file_{}".format(os.getpid()))
+    chunk = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(SSD_FILE_MB):
+            f.write(chunk)
+    return path
+
+
+def remove_test_file(path):
+    os.remove(path)
+    if not os.listdir(TEST_DIRECTORY):
+        os.rmdir(TEST_DIRECTORY)
+
+
+_start_barrier = None
+
+
+def _init_worker(barrier):
+    global _start_barrier
+    _start_barrier = barrier
+
+
+def _run_workload(name, duration, path):
+    # Every worker waits here until all of them have started, however long each took to spawn, and is timed from then
+    _start_barrier.wait(STARTUP_TIMEOUT)
+    start_time = time.perf_counter()
+    work = WORKLOADS[name][2](start_time + duration, path)
+    return work / (time.perf_counter() - start_time)
+
+
+"""
+Runs a set of workloads at the same time, each in its own worker processes, and measures the rate each achieved.
+
+Args:
+    names (list): The workloads to run, keys of WORKLOADS.
+    intensity (dict): The number of worker processes for each workload.
+    duration (float): Seconds to run for.
+    path (str): The file the SSD workload writes to.
+
+Returns:
+    dict: The rate of each workload (the sum over its workers) in its unit per second.
+"""
+def run_phase(names, intensity, duration, path):
+    tasks = [name for name in names for _ in range(intensity[name])]
+    # The barrier is handed to the workers when they are created, synchronisation primitives can't be sent with a task.
+    # A worker blocked in it can't take a second task, so each of the len(tasks) workers runs exactly one.
+    barrier = multiprocessing.Barrier(len(tasks))
+    pool = multiprocessing.Pool(processes=len(tasks), initializer=_init_worker, initargs=(barrier,))
+    results = [(name, pool.apply_async(_run_workload, (name, duration, path))) for name in tasks]
+    pool.close()
+    pool.join()
+
+    rates = dict.fromkeys(names, 0.0)
+    for name, result in results:
+        rates[name] += result.get()
+    return rates
+
+
+"""
+Runs the stress test: each selected workload (CPU, RAM bandwidth and SSD random writes) first runs alone and then all
+of them run together, competing for the same cores, memory bandwidth and disk. How much slower each workload is when
+sharing the machine shows how much co-located services would interfere with each other.
+
+Args:
+    progress_callback: An object that allows the function to update the progress of the test.
+    intensity (dict): The number of worker processes for each workload, defaults to STRESS_INTENSITY. Workloads with 0
+        workers are left out.
+    duration (float): Seconds each phase runs for.
+
+Returns:
+    tuple: The benchmark results, the total score (the mean slowdown in percent, lower is better) and the total
+    wattage.
+"""
+def perform_stress_benchmark(progress_callback, intensity=None, duration=STRESS_DURATION):
+    intensity = dict(STRESS_INTENSITY, **(intensity or {}))
+    names = [name for name in WORKLOADS if intensity.get(name, 0) > 0]
+    if not names:
+        raise ValueError("No stress workloads selected")
+
+    path = create_test_file()
+    total_phases = len(names) + 1 if len(names) > 1 else 1
+    alone = {}
+    try:
+        for index, name in enumerate(names):
+            label, unit = WORKLOADS[name][:2]
+            progress_callback.emit_current_test_info("Running Stress Test: {} alone".format(label))
+            alone.update(run_phase([name], intensity, duration, path))
+            progress_callback.emit_sample("Alone ({}/s)".format(unit), alone[name])
+            progress_callback.update_progress(int((index + 1) / total_phases * 100))
+
+        # A single workload has nothing to compete with
+        together = alone
+        if len(names) > 1:
+            progress_callback.emit_current_test_info("Running Stress Test: All workloads together")
+            together = run_phase(names, intensity, duration, path)
+            for name in names:
+                progress_callback.emit_sample("Together ({}/s)".format(WORKLOADS[name][1]), together[name])
+            progress_callback.update_progress(100)
+    finally:
+        remove_test_file(path)
+
+    benchmark_results = {}
+    for name in names:
+        slowdown = (1 - together[name] / alone[name]) * 100 if alone[name] else 0.0
+        benchmark_results[name] = {
+            "workers": intensity[name],
+            "alone_per_s": round(alone[name], 3),
+            "together_per_s": round(together[name], 3),
+            "slowdown_percent": round(slowdown, 3),
+        }
+        print("{}: {:.1f}% slower when sharing the machine".format(WORKLOADS[name][0], slowdown))
+
+    print("Stress Test completed.")
+
+    total_score = sum(result["slowdown_percent"] for result in benchmark_results.values()) / len(benchmark_results)
+    total_wattage = measure_wattage()
+    return benchmark_results, round(total_score, 3), total_wattage
@@ -0,0 +1,234 @@
+import os
+import threading
+import time
+
+import psutil
+
+
+# A run is flagged as throttled when a core drops below this fraction of the highest frequency seen during the run
+FREQUENCY_DROP_THRESHOLD = 0.85
+# A core's frequency is only compared while it is at least this busy, idle cores are clocked down by the governor
+BUSY_CORE_PERCENT = 50.0
+# Temperature (Celsius) above which we assume the chip is thermally limited
+TEMPERATURE_THRESHOLD = 90.0
+# Share of system CPU time not accounted for by the benchmark process before we call it external load
+EXTERNAL_LOAD_THRESHOLD = 25.0
+# Default seconds between samples
+TELEMETRY_INTERVAL = 0.5
+
+
+class TelemetrySampler(threading.Thread):
+    """
+    Samples system telemetry on a background thread while a benchmark runs.
+
+    Each sample records per-core CPU frequency and utilisation, temperatures, context switches and the RSS of the
+    benchmark process (including its children). The time spent taking samples is tracked so the sampling overhead
+    can be reported alongside the results.
+
+    Args:
+        interval (float): Seconds between samples.
+        pid (int): The process to attribute RSS and CPU time to, defaults to the current process.
+    """
+
+    def __init__(self, interval=TELEMETRY_INTERVAL, pid=None):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.process = psutil.Process(pid or os.getpid())
+        self.samples = []
+        self.sampling_time = 0.0
+        self.start_time = None
+        self.end_time = None
+        self._last_cpu = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        self.start_time = time.perf_counter()
+        # The first cpu_percent call only primes psutil's counters
+        psutil.cpu_percent(percpu=True)
+        self._process_cpu_percent()
+
+        while not self._stop_event.wait(self.interval):
+            sample_start = time.perf_counter()
+            self.samples.append(self.take_sample())
+            self.sampling_time += time.perf_counter() - sample_start
+
+        self.end_time = time.perf_counter()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    """
+    Takes a single telemetry sample.
+
+    Returns:
+        dict: The sample, timestamped in seconds since the sampler started.
+    """
+    def take_sample(self):
+        frequencies = psutil.cpu_freq(percpu=True) or []
+
+        return {
+            "time": time.perf_counter() - self.start_time,
+            "cpu_freq_mhz": [freq.current for freq in frequencies],
+            "cpu_max_freq_mhz": [freq.max for freq in frequencies],
+            "cpu_percent": psutil.cpu_percent(percpu=True),
+            "process_cpu_percent": self._process_cpu_percent(),
+            "temperatures_c": read_temperatures(),
+            "ctx_switches": psutil.cpu_stats().ctx_switches,
+            "rss_bytes": self._process_rss(),
+        }
+
+    def _process_tree(self):
+        try:
+            return [self.process] + self.process.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return []
+
+    def _process_rss(self):
+        rss = 0
+        for process in self._process_tree():
+            try:
+                rss += process.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass
+        return rss
+
+    def _process_cpu_time(self):
+        # Children that exited and were waited for are included in their parent's children_user/children_system, so
+        # CPU time does not disappear from the total when a pool worker exits between two samples
+        cpu_time = 0.0
+        for process in self._process_tree():
+            try:
+                times = process.cpu_times()
+            except psutil.NoSuchProcess:
+                continue
+            cpu_time += times.user + times.system
+            cpu_time += getattr(times, "children_user", 0.0) + getattr(times, "children_system", 0.0)
+        return cpu_time
+
+    def _process_cpu_percent(self):
+        # Compared with the previous sample rather than using Process.cpu_percent(), which returns 0.0 on the first call
+        # for every process and so would never count the children that children() returns as new objects each time.
+        # Normalised to the whole machine so it is comparable to the system-wide utilisation.
+        now, cpu_time = time.perf_counter(), self._process_cpu_time()
+        last, self._last_cpu = self._last_cpu, (now, cpu_time)
+        if last is None or now <= last[0]:
+            return 0.0
+        percent = 100 * max(cpu_time - last[1], 0.0) / ((now - last[0]) * (psutil.cpu_count() or 1))
+        return min(percent, 100.0)
+
+    """
+    Summarises the collected samples, including the throttling and external load flags.
+
+    Returns:
+        dict: The summary and the raw time series.
+    """
+    def report(self):
+        elapsed = (self.end_time or time.perf_counter()) - (self.start_time or time.perf_counter())
+        flags = detect_throttling(self.samples)
+
+        return {
+            "interval": self.interval,
+            "samples": self.samples,
+            "sample_count": len(self.samples),
+            "overhead_percent": round(100 * self.sampling_time / elapsed, 3) if elapsed > 0 else 0.0,
+            "throttled": flags["throttled"],
+            "external_load": flags["external_load"],
+            "reasons": flags["reasons"],
+        }
+
+
+"""
+Reads the current temperatures from psutil. Not every platform exposes sensors (macOS does not), so this returns an
+empty dict when they are unavailable.
+
+Returns:
+    dict: The current temperature of each sensor in Celsius, keyed by "<chip>/<label>".
+"""
+def read_temperatures():
+    if not hasattr(psutil, "sensors_temperatures"):
+        return {}
+
+    try:
+        sensors = psutil.sensors_temperatures()
+    except (OSError, RuntimeError):
+        return {}
+
+    temperatures = {}
+    for chip, entries in sensors.items():
+        for index, entry in enumerate(entries):
+            label = entry.label or str(index)
+            temperatures[f"{chip}/{label}"] = entry.current
+    return temperatures
+
+
+"""
+Looks through a telemetry time series for signs of thermal/frequency throttling or load from other processes.
+
+Args:
+    samples (list): The samples collected by a TelemetrySampler.
+
+Returns:
+    dict: The "throttled" and "external_load" flags and a list of human readable reasons.
+"""
+def detect_throttling(samples):
+    reasons = []
+
+    # Each core is compared with its own peak, and only in samples where it was busy
+    busy_frequencies = {}
+    for s in samples:
+        utilisation = s["cpu_percent"]
+        if len(s["cpu_freq_mhz"]) != len(utilisation):
+            # Only one frequency for the whole package (e.g. macOS), compare it while the CPU as a whole was busy
+            utilisation = [sum(utilisation) / len(utilisation) if utilisation else 0.0] * len(s["cpu_freq_mhz"])
+        for core, (frequency, percent) in enumerate(zip(s["cpu_freq_mhz"], utilisation)):
+            if percent >= BUSY_CORE_PERCENT:
+                busy_frequencies.setdefault(core, []).append(frequency)
+
+    for core, frequencies in sorted(busy_frequencies.items()):
+        if max(frequencies) and min(frequencies) < max(frequencies) * FREQUENCY_DROP_THRESHOLD:
+            reasons.append("CPU {} frequency dropped from {:.0f} MHz to {:.0f} MHz while busy".format(
+                core, max(frequencies), min(frequencies)
+            ))
+
+    peak_temperature = max((max(s["temperatures_c"].values()) for s in samples if s["temperatures_c"]), default=None)
+    if peak_temperature is not None and peak_temperature >= TEMPERATURE_THRESHOLD:
+        reasons.append("Temperature reached {:.1f} C".format(peak_temperature))
+
+    throttled = bool(reasons)
+
+    external_load = False
+    if samples:
+        unaccounted = [
+            sum(s["cpu_percent"]) / len(s["cpu_percent"]) - s["process_cpu_percent"]
+            for s in samples if s["cpu_percent"]
+        ]
+        if unaccounted and sum(unaccounted) / len(unaccounted) >= EXTERNAL_LOAD_THRESHOLD:
+            external_load = True
+            reasons.append("Other processes used {:.0f}% of the CPU on average".format(sum(unaccounted) / len(unaccounted)))
+
+    return {"throttled": throttled, "external_load": external_load, "reasons": reasons}
+
+
+"""
+Runs a benchmark with a TelemetrySampler attached and adds the telemetry report to its results under "telemetry".
+
+Args:
+    benchmark_fn (function): The benchmark entry point, e.g. perform_cpu_benchmark.
+    progress_callback: The object passed through to the benchmark to report progress.
+    interval (float): Seconds between samples.
+    pid (int): The process running the benchmark, if it is not the current one.
+
+Returns:
+    tuple: The benchmark results, total score and total wattage.
+"""
+def run_with_telemetry(benchmark_fn, progress_callback, interval=TELEMETRY_INTERVAL, pid=None):
+    sampler = TelemetrySampler(interval, pid)
+    sampler.start()
+    try:
+        benchmark_results, total_score, total_wattage = benchmark_fn(progress_callback)
+    finally:
+        sampler.stop()
+
+    benchmark_results["telemetry"] = sampler.report()
+    return benchmark_results, total_score, total_wattage
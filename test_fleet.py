@@ -0,0 +1,114 @@
+import json
+import socket
+import threading
+import time
+import unittest
+from unittest import mock
+
+import fleet
+import scheduler
+
+
+SLEEP_SUITE = {
+    "sleep": ("Sleep Benchmark", __name__, "perform_sleep_benchmark"),
+    "failing": ("Failing Benchmark", __name__, "perform_failing_benchmark"),
+}
+FAST_SCHEDULE = {"cooldown": 0, "wait_idle": False}
+
+
+def perform_sleep_benchmark(progress_callback):
+    progress_callback.emit_current_test_info("Sleeping")
+    start_time = time.perf_counter()
+    time.sleep(0.2)
+    progress_callback.update_progress(100)
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    return {"sleep": {"ms": elapsed_ms}}, elapsed_ms, 0.0
+
+
+def perform_failing_benchmark(progress_callback):
+    raise RuntimeError("No GPU found")
+
+
+def request(address, message):
+    with socket.create_connection(address, timeout=10) as connection:
+        connection.sendall((message + "\n").encode())
+        for line in connection.makefile("r"):
+            reply = json.loads(line)
+            if reply["type"] in ("result", "error"):
+                return reply
+
+
+class FleetTest(unittest.TestCase):
+    """
+    Runs several agents on localhost ports in this process, the way a fleet can be tried out on one machine.
+    """
+
+    def setUp(self):
+        patcher = mock.patch.dict(scheduler.SUITES, SLEEP_SUITE)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.agents = []
+        for _ in range(3):
+            server = fleet.start_agent("127.0.0.1", 0, token="secret")
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.addCleanup(server.server_close)
+            self.addCleanup(server.shutdown)
+            self.agents.append(server.server_address)
+
+    def test_agents_on_one_host_run_at_the_same_time(self):
+        coordinator = fleet.Coordinator(token="secret")
+        for host, port in self.agents:
+            coordinator.register(host, port)
+
+        report = coordinator.run(["sleep"], schedule=FAST_SCHEDULE, timeout=30)
+
+        self.assertEqual([result["type"] for result in report["agents"].values()], ["result"] * 3)
+        stats = report["fleet"]["Sleep Benchmark/sleep/ms"]
+        self.assertEqual(stats["agents"], 3)
+        self.assertGreaterEqual(stats["min"], 200)
+        self.assertIn("fingerprint", next(iter(report["agents"].values()))["machine"])
+
+    def test_a_failing_suite_does_not_stop_the_schedule(self):
+        message = json.dumps({
+            "type": "run",
+            "suites": ["failing", "sleep"],
+            "schedule": dict(FAST_SCHEDULE, passes=2),
+            "token": "secret",
+        })
+        reply = request(self.agents[0], message)
+
+        self.assertEqual(reply["type"], "result")
+        runs = reply["report"]["runs"]
+        self.assertEqual([run.get("error") for run in runs if run["suite"] == "failing"], ["No GPU found"] * 2)
+        self.assertEqual(len([run for run in runs if "results" in run]), 2)
+        self.assertEqual(list(reply["report"]["summary"]), ["sleep"])
+
+    def test_busy_agent_refuses_a_second_run(self):
+        message = json.dumps({"type": "run", "suites": ["sleep"], "schedule": FAST_SCHEDULE, "token": "secret"})
+        first = threading.Thread(target=request, args=(self.agents[0], message))
+        first.start()
+        time.sleep(0.05)
+        self.assertEqual(request(self.agents[0], message), {"type": "error", "error": "Agent is busy"})
+        first.join()
+
+    def test_invalid_requests_are_answered_with_an_error(self):
+        invalid = [
+            "not json",
+            json.dumps({"type": "run", "suites": ["sleep"], "token": "wrong"}),
+            json.dumps({"type": "run", "suites": ["missing"], "token": "secret"}),
+            json.dumps({"type": "run", "suites": ["sleep"], "schedule": {"bogus": 1}, "token": "secret"}),
+            json.dumps({"type": "run", "suites": ["sleep"], "options": {"profile_dir": "/"}, "token": "secret"}),
+            json.dumps({"type": "run", "suites": ["sleep"], "schedule": {"passes": "x"}, "token": "secret"}),
+        ]
+        for message in invalid:
+            with self.subTest(message=message):
+                self.assertEqual(request(self.agents[0], message)["type"], "error")
+
+        # The agent is still usable afterwards
+        message = json.dumps({"type": "run", "suites": ["sleep"], "schedule": FAST_SCHEDULE, "token": "secret"})
+        self.assertEqual(request(self.agents[0], message)["type"], "result")
+
+
+if __name__ == "__main__":
+    unittest.main()